@@ -0,0 +1,118 @@
+"""Scalable test circuits for the benchmarks.
+
+Each generator returns the circuit and the port of its output node, the
+size N controls the number of nodes.
+"""
+from pycircuit import Circuit, GND
+from pycircuit.components import VDC, R, C, D, MOS, Port
+
+
+def resistor_ladder(n:int)->tuple[Circuit, Port]:
+    """n sections of a series and a shunt resistor"""
+    circuit = Circuit()
+    vdc = VDC(name="V1", dc=1, ac=1)
+    vdc["n"] << GND
+    circuit.add(vdc)
+
+    node = vdc["p"]
+    for i in range(n):
+        series = R(name=f"RS{i}", value=1e3)
+        shunt = R(name=f"RP{i}", value=10e3)
+        series["p"] << node
+        series["n"] << shunt["p"]
+        shunt["n"] << GND
+        circuit.add(series, shunt)
+        node = series["n"]
+    return circuit, node
+
+
+def _grid(n:int, capacitance:float|None)->tuple[Circuit, Port]:
+    circuit = Circuit()
+    vdc = VDC(name="V1", dc=1, ac=1)
+    source = R(name="RSRC", value=100)
+    vdc["p"] << source["p"]
+    vdc["n"] << GND
+    circuit.add(vdc, source)
+
+    # One anchor per grid node to ground, a 10k resistor or a capacitor if
+    # capacitance is given. The grid resistors connect to its p port
+    nodes = []
+    for i in range(n):
+        row = []
+        for j in range(n):
+            anchor = R(name=f"RG{i}_{j}", value=10e3) if capacitance is None else C(name=f"C{i}_{j}", value=capacitance)
+            anchor["n"] << GND
+            circuit.add(anchor)
+            row.append(anchor["p"])
+        nodes.append(row)
+
+    for i in range(n):
+        for j in range(n):
+            for k, (di, dj) in enumerate(((0, 1), (1, 0))):
+                if i + di < n and j + dj < n:
+                    r = R(name=f"R{i}_{j}_{k}", value=1e3)
+                    r["p"] << nodes[i][j]
+                    r["n"] << nodes[i+di][j+dj]
+                    circuit.add(r)
+
+    source["n"] << nodes[0][0]
+    return circuit, nodes[n-1][n-1]
+
+
+def resistor_mesh(n:int)->tuple[Circuit, Port]:
+    """n x n grid of resistors, each node has a resistor to ground"""
+    return _grid(n, None)
+
+
+def rc_grid(n:int)->tuple[Circuit, Port]:
+    """n x n grid of resistors, each node has a capacitor to ground"""
+    return _grid(n, 1e-12)
+
+
+def diode_chain(n:int)->tuple[Circuit, Port]:
+    """Resistor feeding n forward biased diodes in series"""
+    circuit = Circuit()
+    vdc = VDC(name="V1", dc=0.8*n, ac=1)
+    r = R(name="R1", value=1e3)
+    vdc["p"] << r["p"]
+    vdc["n"] << GND
+    circuit.add(vdc, r)
+
+    node = r["n"]
+    output = node
+    for i in range(n):
+        diode = D(f"D{i}", 1e-14, 1)
+        diode["p"] << node
+        circuit.add(diode)
+        node = diode["n"]
+    node << GND
+    return circuit, output
+
+
+def mos_amplifier(n:int)->tuple[Circuit, Port]:
+    """n cascaded common source stages (small signal model) with resistive loads"""
+    circuit = Circuit()
+    vin = VDC(name="VIN", dc=0.1, ac=1)
+    vin["n"] << GND
+    circuit.add(vin)
+
+    node = vin["p"]
+    for i in range(n):
+        mos = MOS(name=f"M{i}", gm=1e-3, gds=1e-5)
+        load = R(name=f"RL{i}", value=1e3)
+        mos["g"] << node
+        mos["d"] << load["p"]
+        mos["s"] << mos["b"] << load["n"] << GND
+        circuit.add(mos, load)
+        node = mos["d"]
+    return circuit, node
+
+
+CIRCUITS = {
+    "resistor_ladder": resistor_ladder,
+    "resistor_mesh": resistor_mesh,
+    "rc_grid": rc_grid,
+    "diode_chain": diode_chain,
+    "mos_amplifier": mos_amplifier,
+}
+"""Benchmark circuits by name"""
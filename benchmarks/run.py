@@ -0,0 +1,194 @@
+"""Benchmark suite of pycircuit.
+
+Times the phases netlist, assembly, op, tran (per time step) and symbolic
+separately for the scalable circuits of benchmarks.circuits, as well as
+import pycircuit in a fresh interpreter, and stores the results as JSON. Run from the repository root:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json
+
+The second form runs the suite again and reports the phases that got slower.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+from .circuits import CIRCUITS
+
+DEFAULT_SIZES = {
+    "resistor_ladder": [10, 100, 1000, 10000],
+    "resistor_mesh": [5, 10, 30],
+    "rc_grid": [5, 10, 30],
+    "diode_chain": [10, 100, 1000],
+    "mos_amplifier": [10, 100, 1000],
+}
+"""Sizes N of each circuit if none are given (meshes and grids have N*N nodes)"""
+
+REGRESSION = 1.2
+"""Phases that take longer than REGRESSION times the previous run are reported"""
+
+
+def _best(function, repeat:int):
+    """Shortest wall time of repeat calls of function and the last result"""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+_IMPORT = "import time; start = time.perf_counter(); import pycircuit; print(time.perf_counter() - start)"
+
+
+def import_time(repeat:int=3)->float:
+    """Shortest wall time of import pycircuit in a new interpreter, in seconds"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return min(float(subprocess.run([sys.executable, "-c", _IMPORT], cwd=root, capture_output=True,
+                                    text=True, check=True).stdout) for _ in range(repeat))
+
+
+def _assemble(circuit):
+    # A new netlist compiles the circuit again, so the patterns are built from scratch
+    compiled = circuit.compile(circuit.netlist())
+    compiled.assemble_op()
+    compiled.assemble_tran()
+    return compiled
+
+
+def benchmark(name:str, size:int, repeat:int=3, tran_steps:int=100, symbolic_max:int=10)->dict:
+    """Times of the phases for the circuit name of size N, in seconds"""
+    circuit, output = CIRCUITS[name](size)
+    phases = {}
+
+    phases["netlist"], factory = _best(circuit.netlist, repeat)
+    factory.set_name(output, "out")
+
+    # Compiling also netlists, which is subtracted
+    assembly, compiled = _best(lambda: _assemble(circuit), repeat)
+    phases["assembly"] = max(assembly - phases["netlist"], 0.0)
+
+    compiled = circuit.compile(factory)
+    compiled.assemble_op()
+    phases["reassembly"], _ = _best(compiled.assemble_op, repeat)
+
+    phases["op"], _ = _best(lambda: circuit.analyse_op(factory), repeat)
+
+    def tran()->float:
+        tstep = 1e-9
+        points = circuit.iter_tran(tstop=tran_steps*tstep, tstep=tstep, factory=factory, probes=["out"])
+        # The first point is the operating point
+        next(points)
+        start = time.perf_counter()
+        steps = sum(1 for _ in points)
+        return (time.perf_counter() - start)/steps
+    phases["tran_step"] = min(tran() for _ in range(repeat))
+
+    phases["symbolic"] = None
+    if size <= symbolic_max:
+        try:
+            phases["symbolic"], _ = _best(lambda: circuit.analyse_symbolic(factory, outputs=["out"]), 1)
+        except NotImplementedError:
+            pass
+
+    return {
+        "circuit": name,
+        "size": size,
+        "variables": len(compiled.assemble_op()[0]),
+        "components": len(circuit.components),
+        "phases": phases,
+    }
+
+
+def _git_commit()->str|None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _version(package:str)->str|None:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def run(circuits:list[str], sizes:list[int]|None, repeat:int, tran_steps:int, symbolic_max:int)->dict:
+    seconds = import_time(repeat)
+    print(f"import pycircuit {seconds:.3e}", file=sys.stderr)
+
+    results = []
+    for name in circuits:
+        for size in sizes or DEFAULT_SIZES[name]:
+            result = benchmark(name, size, repeat, tran_steps, symbolic_max)
+            results.append(result)
+            print(f"{name:16} N={size:<6} " + " ".join(
+                f"{phase}={value:.3e}" for phase, value in result["phases"].items() if value is not None), file=sys.stderr)
+
+    return {
+        "metadata": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "versions": {package: _version(package) for package in ("pycircuit", "numpy", "scipy", "sympy")},
+            "repeat": repeat,
+            "tran_steps": tran_steps,
+        },
+        "import": seconds,
+        "results": results,
+    }
+
+
+def compare(old:dict, new:dict)->list[str]:
+    """Phases of new that are slower than in old by more than REGRESSION"""
+    previous = {(result["circuit"], result["size"]): result["phases"] for result in old["results"]}
+    regressions = []
+    if old.get("import") and new["import"] > REGRESSION*old["import"]:
+        regressions.append(f"import pycircuit: {old['import']:.3e}s -> {new['import']:.3e}s "
+                           f"({new['import']/old['import']:.2f}x)")
+    for result in new["results"]:
+        phases = previous.get((result["circuit"], result["size"]), {})
+        for phase, value in result["phases"].items():
+            if value is not None and phases.get(phase) and value > REGRESSION*phases[phase]:
+                regressions.append(f"{result['circuit']} N={result['size']} {phase}: "
+                                   f"{phases[phase]:.3e}s -> {value:.3e}s ({value/phases[phase]:.2f}x)")
+    return regressions
+
+
+def main(argv:list[str]|None=None)->int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--circuits", nargs="+", choices=list(CIRCUITS), default=list(CIRCUITS))
+    parser.add_argument("--sizes", nargs="+", type=int, help="sizes N, by default DEFAULT_SIZES of each circuit")
+    parser.add_argument("--repeat", type=int, default=3, help="the best of repeat runs is reported")
+    parser.add_argument("--tran-steps", type=int, default=100)
+    parser.add_argument("--symbolic-max", type=int, default=10, help="largest N of the symbolic analysis")
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="JSON file of a previous run")
+    args = parser.parse_args(argv)
+
+    results = run(args.circuits, args.sizes, args.repeat, args.tran_steps, args.symbolic_max)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), results)
+        for regression in regressions:
+            print(regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
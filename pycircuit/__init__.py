@@ -1,3 +1,17 @@
 from .circuit import Circuit
+from .compiled import CompiledCircuit
 from .components import GND
-from .netlister import NetFactory, Net
\ No newline at end of file
+from .netlister import NetFactory, Net
+from .montecarlo import MonteCarlo, Normal, Uniform
+from .profiling import Profile
+from .solver import DenseLU, Solver, SparseLU
+from .spice import read_spice
+from .subcircuit import SubCircuit
+
+
+def __getattr__(name):
+    # SymPy is imported on first use, not with the package
+    if name == "SymbolicFunction":
+        from .symbolic import SymbolicFunction
+        return SymbolicFunction
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
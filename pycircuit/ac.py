@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .components import Analysis
+from .matrix import TripletMatrix
+from .solver import Solver
+
+DENSE_LIMIT = 64
+"""Systems up to this dimension are solved for many frequencies at once with dense batched LU"""
+DENSE_BATCH_BYTES = 64*1024*1024
+"""Memory used for the stacked dense matrices of one batch"""
+
+
+def _solve_dense(g:np.ndarray, c:np.ndarray, b:np.ndarray, omegas:np.ndarray, result:np.ndarray):
+    dimension = len(b)
+    batch = max(1, DENSE_BATCH_BYTES//(16*dimension*dimension))
+    for start in range(0, len(omegas), batch):
+        w = omegas[start:start+batch]
+        a = g[None, :, :] + 1j*w[:, None, None]*c[None, :, :]
+        rhs = np.broadcast_to(b[None, :, None], (len(w), dimension, 1))
+        result[:, start:start+len(w)] = np.linalg.solve(a, rhs)[:, :, 0].T
+
+
+def _solve_sparse(lu:Solver, data_g:np.ndarray, data_c:np.ndarray, indices:np.ndarray, indptr:np.ndarray,
+                  b:np.ndarray, omegas:np.ndarray, result:np.ndarray, columns:range):
+    from scipy.sparse import csc_matrix
+
+    # All frequencies share the pattern, so the LU ordering is computed once
+    shape = (len(b), len(b))
+    for i in columns:
+        lu.factorize(csc_matrix((data_g + 1j*omegas[i]*data_c, indices, indptr), shape=shape))
+        result[:, i] = lu.solve(b)
+
+
+def solve_ac(compiled, g:TripletMatrix, c:TripletMatrix, b:np.ndarray, freqs:np.ndarray, workers:int=1)->np.ndarray:
+    """Solve (g + j*2*pi*f*c)*x = b for all frequencies f, returns one column per frequency"""
+    omegas = 2*np.pi*np.asarray(freqs, dtype=np.float64)
+    dimension = len(b)
+    result = np.empty((dimension, len(omegas)), dtype=np.complex128)
+
+    # Both matrices are assembled on the union of their sparsity patterns
+    stamps = g.copy(capacity=g.count + c.count)
+    stamps.extend(c)
+    pattern = compiled.pattern(Analysis.TRANSIENT, "ac", stamps)
+    data_g = np.bincount(pattern.positions[:g.count], weights=g.values[:g.count], minlength=pattern.nnz)
+    data_c = np.bincount(pattern.positions[g.count:], weights=c.values[:c.count], minlength=pattern.nnz)
+
+    if dimension <= DENSE_LIMIT:
+        from scipy.sparse import csc_matrix
+
+        shape = (dimension, dimension)
+        _solve_dense(csc_matrix((data_g, pattern.indices, pattern.indptr), shape=shape).toarray(),
+                     csc_matrix((data_c, pattern.indices, pattern.indptr), shape=shape).toarray(),
+                     b, omegas, result)
+        return result
+
+    chunks = [range(chunk[0], chunk[-1]+1) for chunk in np.array_split(np.arange(len(omegas)), max(1, workers)) if len(chunk)]
+    if len(chunks) == 1:
+        _solve_sparse(compiled.solver(Analysis.TRANSIENT, "ac"), data_g, data_c, pattern.indices, pattern.indptr, b, omegas, result, chunks[0])
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_solve_sparse, compiled.solver(Analysis.TRANSIENT, "ac"), data_g, data_c, pattern.indices, pattern.indptr, b, omegas, result, chunk)
+                   for chunk in chunks]
+        for future in futures:
+            future.result()
+    return result
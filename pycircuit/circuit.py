@@ -1,15 +1,31 @@
 
+from __future__ import annotations
+import logging
 import math
+import os
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import numpy as np
-from scipy.sparse import csc_matrix, csr_matrix
-from scipy.sparse.linalg import spsolve
-from sympy import Matrix, linsolve, simplify, symbols, zeros
 
+from . import profiling
+from .ac import solve_ac
+from .compiled import SYMBOLIC_CACHE_SIZE, CompiledCircuit
 from .components import Analysis, Component, Port
 from .netlister.net_factory import Net, NetFactory
-from .utils import delete_from_csr
+from .newton import NewtonOptions, solve_newton
+from .profiling import Profile
+from .progress import logger, report_progress
+from .recorder import probe_indices, recorder
+from .solver import Solver, SparseLU
+from .sweep import sweep_op, sweep_rhs
+from .transient import iter_integrate
+
+if TYPE_CHECKING:
+    from sympy import Expr
+
+    from .symbolic import SymbolicFunction
 
 
 @dataclass
@@ -21,18 +37,63 @@ class Node:
 class Circuit:
     def __init__(self) -> None:
         self.components : list[Component] = []
+        self._compiled : CompiledCircuit | None = None
+        self.newton = NewtonOptions()
+        """Convergence settings for circuits with nonlinear components"""
+        self.progress : Callable[[float, float], None] | None = None
+        """Called as progress(t, tstop) during transient analyses, at most every PROGRESS_INTERVAL seconds"""
+        self.factory : NetFactory | None = None
+        """Nets of ports that are connected without << (e.g. by read_spice()).
+        netlist() adds the connections made with << to it."""
+        self.solver : Callable[[], Solver] = SparseLU
+        """Creates the linear solvers of all analyses, e.g. DenseLU for small
+        circuits or functools.partial(SparseLU, ordering="RCM")"""
 
     def add(self, *components):
         for component in components:
             self.components.append(component)
 
+    def __getstate__(self) -> dict:
+        # Ports are pickled without their connections, they are kept here as
+        # a flat list (e.g. for the workers of a MonteCarlo analysis)
+        state = self.__dict__.copy()
+        state["_connections"] = [(port, port.connections) for component in self.components
+                                 for port in component.ports.values() if port.connections]
+        return state
+
+    def __setstate__(self, state:dict):
+        connections = state.pop("_connections")
+        self.__dict__.update(state)
+        for port, connected in connections:
+            port.connections = connected
+
+    def profile(self, callback:Callable[[str, float], None]|None=None) -> Profile:
+        """Statistics of the analyses run within a with block.
+
+            with circuit.profile() as report:
+                circuit.analyse_tran(1e-6, 1e-9)
+            print(report)
+
+        The report holds the wall time and number of calls of each phase (e.g.
+        "tran/stamp", "tran/factorize", "tran/solve"), the size and fill-in of
+        the factorized matrices, the time spent in update() of each dynamic
+        component and counters like the Newton iterations. callback(phase,
+        seconds) is called whenever a phase finishes. Without an active profile
+        the analyses are not instrumented.
+        """
+        return Profile(callback)
+
     def netlist(self) -> NetFactory:
-        factory = NetFactory()
+        with profiling.phase("netlist"):
+            return self._netlist()
 
-        for component in self.components:
-            for port in component.ports.values():
-                for connected_port in port.connections:
-                    factory.add_connection(port, connected_port)
+    def _netlist(self) -> NetFactory:
+        factory = self.factory if self.factory is not None else NetFactory()
+
+        factory.add_connections((port, connected_port)
+                                for component in self.components
+                                for port in component.ports.values()
+                                for connected_port in port.connections)
 
         # Make sure that each net gets an unique id starting from 0 to N
         # N is the number of nodes
@@ -48,153 +109,255 @@ class Circuit:
             counter += component.get_num_additional_row_columns(analysis)
         return counter
 
-    def analyse_op(self, factory: NetFactory|None = None):
-
-        # Create a netlist if it has not been created yet
-        factory = factory or self.netlist()
+    def _topology(self) -> tuple[int, int]:
+        """Fingerprint of the connectivity of the circuit.
 
-        # Find out the dimensions of the matrix
-        additional_row_columns = self._get_num_additional_row_columns(Analysis.OP)
-        dimension = len(factory.nets) + additional_row_columns
-
-        m = csr_matrix((dimension, dimension), dtype=np.float64)
-        b = csr_matrix((dimension, 1), dtype=np.float64)
-
-        # Create x (variables to solve for)
-        x = []
-        for net in factory.nets:
-            if net.name:
-                x.append(net.name)
-            else:
-                x.append(f"V{net.net_id}")
-
-        # Construct matrix
-        additiona_row_cols_counter = len(factory.nets)
+        Components and connections can only be added, so the number of
+        components and connections changes with every modification.
+        """
+        connections = 0
         for component in self.components:
-            additional_row_columns = component.get_num_additional_row_columns(Analysis.OP)
-            component.apply_op_matrix(factory,
-                                      additiona_row_cols_counter if additional_row_columns else -1,
-                                      m,
-                                      x,
-                                      b,
-                                      dimension)
-            additiona_row_cols_counter += additional_row_columns
-
-        # Remove ground nets
-        ids_to_remove = []
-        for net in factory.nets:
-            if net.is_gnd():
-                ids_to_remove.append(net.net_id)
-                del x[net.net_id]
-
-        m = delete_from_csr(m, ids_to_remove, ids_to_remove)
-        b = delete_from_csr(b, ids_to_remove, [])
-
-        answ = spsolve(m, b)
-        return x, answ
+            for port in component.ports.values():
+                connections += len(port.connections)
+        return len(self.components), connections
+
+    def _parameters(self) -> tuple:
+        """Values of the scalar attributes (the parameters) of all components"""
+        return tuple(tuple((name, value) for name, value in vars(component).items()
+                           if isinstance(value, (int, float, complex, str, type(None))))
+                     for component in self.components)
+
+    def compile(self, factory: NetFactory|None = None) -> CompiledCircuit:
+        """Netlist the circuit and prepare the matrix structure of the analyses.
+
+        The result is cached and reused by all analyses as long as the
+        topology does not change. Passing a factory (e.g. with named nets)
+        compiles the circuit with that netlist.
+        """
+        topology = self._topology()
+        compiled = self._compiled
+
+        if factory is not None:
+            if compiled is None or compiled.factory is not factory or compiled.topology != topology:
+                with profiling.phase("compile"):
+                    compiled = CompiledCircuit(self, factory, topology)
+        elif compiled is None or compiled.topology != topology:
+            factory = self.netlist()
+            with profiling.phase("compile"):
+                compiled = CompiledCircuit(self, factory, topology)
+
+        self._compiled = compiled
+        return compiled
 
-    def analyse_tran(self, tstop:float, tstep:float, tstart:float=0.0, factory: NetFactory|None = None):
+    def analyse_op(self, factory: NetFactory|None = None):
+        with profiling.phase("op"):
+            return self._analyse_op(factory)
 
-        # Create a netlist if it has not been created yet
-        factory = factory or self.netlist()
+    def _analyse_op(self, factory: NetFactory|None):
 
-        # Find out the dimensions of the matrix
-        additional_row_columns = self._get_num_additional_row_columns(Analysis.TRANSIENT)
-        dimension = len(factory.nets) + additional_row_columns
+        compiled = self.compile(factory)
 
-        g = csr_matrix((dimension, dimension), dtype=np.float64)
-        c = csr_matrix((dimension, dimension), dtype=np.float64)
-        b = csr_matrix((dimension, 1), dtype=np.float64)
+        if not compiled.layout(Analysis.OP).nonlinear:
+            x, m, b = compiled.assemble_op()
+            lu = compiled.solver(Analysis.OP, "m")
+            lu.factorize(m)
+            return x, lu.solve(b)
 
-        # Create x (variables to solve for)
-        x = []
-        for net in factory.nets:
-            if net.name:
-                x.append(net.name)
-            else:
-                x.append(f"V{net.net_id}")
-
-
-
-        sig = csr_matrix((dimension, 1), dtype=np.float64)
-        sig[0] = 1
+        x, m, b = compiled.stamp_op()
+        answ = solve_newton(compiled, Analysis.OP, m, b, np.zeros(len(x)),
+                            compiled.solver(Analysis.OP, "jacobian"), self.newton)
+        return x, answ
 
-        # Construct matrix
-        additiona_row_cols_counter = len(factory.nets)
-        for component in self.components:
-            additional_row_columns = component.get_num_additional_row_columns(Analysis.TRANSIENT)
-            component.apply_tran_matrix(factory,
-                                            additiona_row_cols_counter if additional_row_columns else -1,
-                                            g,
-                                            c,
-                                            x,
-                                            b,
-                                            dimension)
-            additiona_row_cols_counter += additional_row_columns
-
-        # Remove ground nets
-        ids_to_remove = []
-        for net in factory.nets:
-            if net.is_gnd():
-                ids_to_remove.append(net.net_id)
-                del x[net.net_id]
-        sig = delete_from_csr(sig, ids_to_remove, [])
-        g = delete_from_csr(g, ids_to_remove, ids_to_remove)
-        c = delete_from_csr(c, ids_to_remove, ids_to_remove)
-        b = delete_from_csr(b, ids_to_remove, [])
-
-        print("Solve for OP solution")
+    def analyse_dc_sweep(self, component:Component, values, parameter:str="dc", factory: NetFactory|None = None):
+        """OP for each value of a source (or any other parameter of component).
+
+        Returns the variable names and one column of results per value. Sweeps of
+        right hand side parameters (e.g. VDC.dc, IDC.dc) of linear circuits are
+        solved with a single factorization.
+        """
+        with profiling.phase("dc_sweep"):
+            compiled = self.compile(factory)
+            values = np.asarray(values, dtype=np.float64)
+
+            if parameter in component.rhs_parameters and not compiled.layout(Analysis.OP).nonlinear:
+                return sweep_rhs(compiled, component, parameter, values)
+            return sweep_op(self, compiled, component, parameter, values)
+
+    def analyse_param_sweep(self, component:Component, parameter:str, values, factory: NetFactory|None = None):
+        """OP for each value of a parameter which changes the matrix, e.g. R.value.
+
+        The topology is compiled once, each point only refreshes the values.
+        """
+        with profiling.phase("param_sweep"):
+            compiled = self.compile(factory)
+            return sweep_op(self, compiled, component, parameter, np.asarray(values))
+
+    def analyse_tran(self, tstop:float, tstep:float, tstart:float=0.0, factory: NetFactory|None = None,
+                     method:str="euler", adaptive:bool=False, reltol:float=1e-3, abstol:float=1e-6,
+                     tstep_min:float|None=None, tstep_max:float|None=None, probes:list[str]|None=None,
+                     sink:str|os.PathLike|None=None):
+        """Transient analysis starting at the operating point.
+
+        method selects the integration ("euler", "trap" or "gear2"). With
+        adaptive=True the time step (starting at tstep) is controlled by the
+        local truncation error and the returned time vector is non-uniform.
+
+        probes restricts the recorded variables to the given names (which are
+        then returned instead of all variables). With a sink path the samples
+        are streamed in chunks to a .npy file (one row per time point: the time
+        and the probes) and memory mapped views of it are returned.
+        """
+        with profiling.phase("tran"):
+            x, points = self._tran_points(tstop, tstep, factory, method, adaptive, reltol, abstol, tstep_min, tstep_max)
+
+            with recorder(x, probes, sink, math.ceil(tstop/tstep)+1 if not adaptive else 1024) as samples:
+                for t, x_n in points:
+                    samples.append(t, x_n)
+
+            signals, t = samples.result()
+        return (x if probes is None else list(probes)), signals, t
+
+    def iter_tran(self, tstop:float, tstep:float, tstart:float=0.0, factory: NetFactory|None = None,
+                  method:str="euler", adaptive:bool=False, reltol:float=1e-3, abstol:float=1e-6,
+                  tstep_min:float|None=None, tstep_max:float|None=None, probes:list[str]|None=None,
+                  block:int|None=None) -> Iterator[tuple[float, np.ndarray]]:
+        """Transient analysis as a generator, time points are only simulated when requested.
+
+        Yields (t, values) for every time point, values holds the probes (or all
+        variables in the order returned by analyse_tran()). With block=n the
+        time points are yielded in blocks of up to n: t is then an array and
+        values has one column per time point. Stopping the iteration (e.g. with
+        break) stops the simulation. The arguments are those of analyse_tran().
+        Within circuit.profile() the simulation (but not the code consuming the
+        time points) is recorded as phase "tran", one call per time point.
+        """
+        return profiling.iterate("tran", self._iter_tran(tstop, tstep, factory, method, adaptive, reltol, abstol,
+                                                         tstep_min, tstep_max, probes, block))
+
+    def _iter_tran(self, tstop:float, tstep:float, factory: NetFactory|None, method:str, adaptive:bool,
+                   reltol:float, abstol:float, tstep_min:float|None, tstep_max:float|None,
+                   probes:list[str]|None, block:int|None) -> Iterator[tuple[float, np.ndarray]]:
+        x, points = self._tran_points(tstop, tstep, factory, method, adaptive, reltol, abstol, tstep_min, tstep_max)
+
+        if block is None:
+            indices = probe_indices(x, probes)
+            for t, x_n in points:
+                yield t, (x_n.copy() if indices is None else x_n[indices])
+            return
+
+        samples = recorder(x, probes, None, block)
+        for t, x_n in points:
+            samples.append(t, x_n)
+            if samples.count == block:
+                values, t = samples.result()
+                yield t, values
+                samples = recorder(x, probes, None, block)
+        if samples.count:
+            values, t = samples.result()
+            yield t, values
+
+    def _tran_points(self, tstop:float, tstep:float, factory: NetFactory|None, method:str, adaptive:bool,
+                     reltol:float, abstol:float, tstep_min:float|None,
+                     tstep_max:float|None) -> tuple[list, Iterator[tuple[float, np.ndarray]]]:
+        """Variable names and a generator of the time points (t, x) of a transient analysis"""
+
+        compiled = self.compile(factory)
+        factory = compiled.factory
+
+        x, g_stamps, c_stamps, b = compiled.stamp_tran()
+        dimension = len(x)
+
+        logger.info("Solve for OP solution")
         op_x, op_solution = self.analyse_op(factory)
-
-        for var in x:
-            op_val_id = op_x.index(var)
-            val_id = x.index(var)
-            sig[val_id,0] = op_solution[op_val_id]
-
-            print(f"{var} = {op_solution[op_val_id]}")
-
-        print("Start transient solution")
-        N = math.ceil(tstop/tstep)
-        signals = sig.toarray()
-
-        for i in range(N):
-
-            percentage = round(i*100/N)
-            if (percentage+1)%3 == 0:
-                print(percentage, "%", end='\r')
-
-            last_solution = signals[:, -1].reshape(-1, 1)
-
-            # Apply dynamic updates of components
-
-            g_add = csr_matrix(g.shape, dtype=np.float64)
-            c_add = csr_matrix(c.shape, dtype=np.float64)
-            b_add = csr_matrix(b.shape, dtype=np.float64)
-
-            for component in self.components:
-                component.update(factory, i*tstep, tstep, last_solution, g_add, c_add, x, b_add)
-
-            solution = spsolve((tstep*(g+g_add)+(c+c_add)), (b+b_add)*tstep+(c+c_add)*last_solution)
-            signals = np.c_[signals, solution]
-
-
-        return x, signals, np.array(range(N+1))*tstep
-
-
-    def analyse_symbolic(self, factory: NetFactory|None = None)->dict[str, Matrix]:
-
-        # Create a netlist if it has not been created yet
-        factory = factory or self.netlist()
+        op_ids = {var: i for i, var in enumerate(op_x)}
+
+        sig = np.zeros(dimension, dtype=np.float64)
+        for val_id, var in enumerate(x):
+            sig[val_id] = op_solution[op_ids[var]]
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for var, value in zip(x, sig):
+                logger.debug("%s = %g", var, value)
+
+        logger.info("Start transient solution")
+        points = iter_integrate(self, compiled, x, g_stamps, c_stamps, b, sig, tstop, tstep,
+                                method=method, adaptive=adaptive, reltol=reltol, abstol=abstol,
+                                tstep_min=tstep_min, tstep_max=tstep_max)
+
+        return x, report_progress(points, tstop, self.progress)
+
+    def analyse_ac(self, freqs, factory: NetFactory|None = None, workers:int=1):
+        """Small signal analysis, solves (G + j*2*pi*f*C)*x = b for all frequencies in freqs.
+
+        G and C are the transient stamps, nonlinear components are linearised at
+        the operating point and the ac values of the sources are the excitation.
+        workers > 1 distributes the frequencies of large circuits over threads.
+        """
+
+        with profiling.phase("ac"):
+            return self._analyse_ac(freqs, factory, workers)
+
+    def _analyse_ac(self, freqs, factory: NetFactory|None, workers:int):
+
+        compiled = self.compile(factory)
+
+        x, g, c, _ = compiled.stamp_tran()
+        b = compiled.stamp_ac()
+
+        if compiled.layout(Analysis.TRANSIENT).nonlinear:
+            op_x, op_solution = self.analyse_op(compiled.factory)
+            op_ids = {var: i for i, var in enumerate(op_x)}
+            operating_point = np.array([op_solution[op_ids[var]] for var in x])
+            g.extend(compiled.stamp_nonlinear(Analysis.TRANSIENT, operating_point))
+
+        freqs = np.asarray(freqs, dtype=np.float64)
+        with profiling.phase("solve"):
+            answ = solve_ac(compiled, g, c, b, freqs, workers=workers)
+        return x, answ, freqs
+
+    def analyse_symbolic(self, factory: NetFactory|None = None, lambdify:bool=False, outputs:list[str]|None=None,
+                         simplify:bool=False)->dict[str, Expr]|SymbolicFunction:
+        """Solve the circuit symbolically in s and the string valued parameters.
+
+        Only the variables in outputs are solved for (all if None). The results
+        are reduced rational functions, simplify=True additionally runs sympy's
+        simplify() on them. With lambdify=True the results are returned as a
+        compiled SymbolicFunction for fast numeric evaluation. It is cached as
+        long as neither the topology nor any parameter of the circuit changes,
+        the last SYMBOLIC_CACHE_SIZE parameter sets are kept.
+        """
+        with profiling.phase("symbolic"):
+            compiled = self.compile(factory)
+            if not lambdify:
+                return self._solve_symbolic(compiled.factory, outputs, simplify)
+
+            key = (self._parameters(), tuple(outputs) if outputs is not None else None, simplify)
+            function = compiled.symbolic.pop(key, None)
+            if function is None:
+                from .symbolic import SymbolicFunction
+
+                results = self._solve_symbolic(compiled.factory, outputs, simplify)
+                with profiling.phase("lambdify"):
+                    function = SymbolicFunction(results)
+                while len(compiled.symbolic) >= SYMBOLIC_CACHE_SIZE:
+                    del compiled.symbolic[next(iter(compiled.symbolic))]
+            # The most recently used function is the last one
+            compiled.symbolic[key] = function
+            return function
+
+    def _solve_symbolic(self, factory: NetFactory, outputs:list[str]|None, simplify:bool)->dict[str, Expr]:
+        # SymPy is only imported by symbolic analyses
+        from sympy import symbols
+
+        from .symbolic import SymbolicMatrix, solve_symbolic
 
         # Find out the dimensions of the matrix
         additional_row_columns = self._get_num_additional_row_columns(Analysis.SYMBOLIC)
         dimension = len(factory.nets) + additional_row_columns
 
-
-        # Create matrix
-        m = zeros(dimension, dimension)
-        # Create right hand side
-        b = zeros(dimension, 1)
+        # Sparse matrix and right hand side
+        m = SymbolicMatrix()
+        b = SymbolicMatrix()
         # Create x (variables to solve for)
         x = []
         for net in factory.nets:
@@ -204,25 +367,30 @@ class Circuit:
                 x.append(symbols(f"V{net.net_id}"))
 
         # Construct matrix
-        additiona_row_cols_counter = len(factory.nets)
-        for component in self.components:
-            additional_row_columns = component.get_num_additional_row_columns(Analysis.SYMBOLIC)
-            component.apply_symbolic_matrix(factory,
-                                            additiona_row_cols_counter if additional_row_columns else -1,
-                                            m,
-                                            x,
-                                            b,
-                                            dimension)
-            additiona_row_cols_counter += additional_row_columns
-
-        # Remove ground nets
-        for net in factory.nets:
-            if net.is_gnd():
-                m.col_del(net.net_id)
-                m.row_del(net.net_id)
-                del x[net.net_id]
-                b.row_del(net.net_id)
-
-        answ = simplify(m.solve(b))
-
-        return {str(x[i]): answ[i] for i, _ in enumerate(x)}
+        with profiling.phase("stamp"):
+            additiona_row_cols_counter = len(factory.nets)
+            for component in self.components:
+                additional_row_columns = component.get_num_additional_row_columns(Analysis.SYMBOLIC)
+                component.apply_symbolic_matrix(factory,
+                                                additiona_row_cols_counter if additional_row_columns else -1,
+                                                m,
+                                                x,
+                                                b,
+                                                dimension)
+                additiona_row_cols_counter += additional_row_columns
+
+        # Ground nets are left out of the system
+        ground = {net.net_id for net in factory.nets if net.is_gnd()}
+        keep = [i for i in range(dimension) if i not in ground]
+        names = {str(x[i]): i for i in keep}
+
+        if outputs is None:
+            outputs = list(names)
+        for output in outputs:
+            if output not in names:
+                raise ValueError(f"Unknown output {output}")
+
+        with profiling.phase("solve"):
+            answ = solve_symbolic(m, b, keep, [names[output] for output in outputs], simplify)
+
+        return dict(zip(outputs, answ))
@@ -0,0 +1,225 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import profiling
+from .components import Analysis, Component, ComponentGroup
+from .matrix import GND_INDEX, SparsityPattern, TripletMatrix
+from .netlister.net_factory import NetFactory
+
+if TYPE_CHECKING:
+    from scipy.sparse import csc_matrix
+
+    from .solver import Solver
+
+
+SYMBOLIC_CACHE_SIZE = 8
+"""Number of compiled symbolic results kept per topology (least recently used are dropped)"""
+
+
+@dataclass
+class Layout:
+    """Position of the variables of one analysis in the system matrix"""
+    dimension: int
+    indices: list[int]
+    """Index of the first additional row/column of each component (-1 if it has none)"""
+    nonlinear: list[tuple[Component, int]]
+    """Components (and their index) that need Newton-Raphson iterations"""
+    dynamic: list[Component]
+    """Components that change the system during a transient simulation (override update())"""
+    groups: list[ComponentGroup]
+    """Components grouped by class, for stamping whole groups at once"""
+    sizes: dict[ComponentGroup, list[int]]
+    """Number of additional rows/columns of each component of a group"""
+    variables: list[str] | None = None
+    """Names of the additional variables (in the order of their rows), known
+    after the first assembly. The node names are not cached, nets can be
+    renamed with NetFactory.set_name() at any time."""
+
+
+class CompiledCircuit:
+    """Topology of a circuit, prepared for repeated analyses.
+
+    Holds the netlist (net ids and matrix indices), the additional rows of each
+    component and the sparsity patterns of the assembled matrices. Analyses
+    only re-stamp the numeric values, so changing a parameter (e.g. r1.value)
+    does not require compiling the circuit again.
+    """
+
+    def __init__(self, circuit, factory:NetFactory, topology:tuple[int, int]) -> None:
+        self.circuit = circuit
+        self.factory = factory
+        self.topology = topology
+        self._layouts : dict[Analysis, Layout] = {}
+        self._patterns : dict[tuple[Analysis, str], SparsityPattern] = {}
+        self._solver_caches : dict[tuple[Analysis, str], dict] = {}
+        self.symbolic : dict[tuple, object] = {}
+        """Compiled symbolic results (SymbolicFunction) by component parameters,
+        in the order of their last use"""
+
+    def node_names(self) -> list[str]:
+        x = []
+        for net in self.factory.nets:
+            if net.index == GND_INDEX:
+                continue
+            if net.name:
+                x.append(net.name)
+            else:
+                x.append(f"V{net.net_id}")
+        return x
+
+    def layout(self, analysis:Analysis) -> Layout:
+        layout = self._layouts.get(analysis)
+        if layout is None:
+            counter = self.factory.num_nodes
+            indices = []
+            nonlinear = []
+            dynamic = []
+            members : dict[type, tuple[list, list, list]] = {}
+            for component in self.circuit.components:
+                additional_row_columns = component.get_num_additional_row_columns(analysis)
+                index = counter if additional_row_columns else -1
+                indices.append(index)
+                if component.is_nonlinear():
+                    nonlinear.append((component, index))
+                if component.is_dynamic():
+                    dynamic.append(component)
+                counter += additional_row_columns
+
+                components, group_indices, sizes = members.setdefault(type(component), ([], [], []))
+                components.append(component)
+                group_indices.append(index)
+                sizes.append(additional_row_columns)
+
+            groups = {ComponentGroup(components, np.array(group_indices, dtype=np.intp)): sizes
+                      for components, group_indices, sizes in members.values()}
+            layout = self._layouts[analysis] = Layout(counter, indices, nonlinear, dynamic, list(groups), groups)
+        return layout
+
+    def _stamp(self, layout:Layout, method:str, *matrices, b:np.ndarray) -> list:
+        """Stamp all components with method (apply_op_matrix or apply_tran_matrix).
+
+        Classes that implement method + "_group" are stamped a group at a time.
+        Returns the variable names.
+        """
+        if layout.variables is not None:
+            x = []
+            for group in layout.groups:
+                self._stamp_group(group, method, matrices, x, b, layout.dimension)
+            return self.node_names() + layout.variables
+
+        # The components append the names of their additional variables while
+        # stamping, they are sorted into the order of the rows afterwards
+        variables = []
+        for group in layout.groups:
+            x = []
+            self._stamp_group(group, method, matrices, x, b, layout.dimension)
+            rows = [index + i for index, size in zip(group.indices, layout.sizes[group]) for i in range(size)]
+            if len(rows) != len(x):
+                rows = [layout.dimension]*len(x)
+            variables.extend(zip(rows, range(len(variables), len(variables) + len(x)), x))
+
+        layout.variables = [name for _, _, name in sorted(variables)]
+        return self.node_names() + layout.variables
+
+    def _stamp_group(self, group:ComponentGroup, method:str, matrices:tuple, x:list, b:np.ndarray, dimension:int):
+        cls = type(group.components[0])
+        if cls.has_group_stamps(method):
+            getattr(cls, method + "_group")(self.factory, group, *matrices, x, b, dimension)
+            return
+        for component, index in zip(group.components, group.indices):
+            getattr(component, method)(self.factory, int(index), *matrices, x, b, dimension)
+
+    def _triplets(self, analysis:Analysis, name:str) -> TripletMatrix:
+        layout = self.layout(analysis)
+        pattern = self._patterns.get((analysis, name))
+        capacity = len(pattern) if pattern else 4*len(self.circuit.components)
+        return TripletMatrix((layout.dimension, layout.dimension), capacity=max(capacity, 1))
+
+    def pattern(self, analysis:Analysis, name:str, triplets:TripletMatrix) -> SparsityPattern:
+        """Sparsity pattern of triplets, cached under (analysis, name)"""
+        pattern = self._patterns.get((analysis, name))
+        if pattern is None or not pattern.matches(triplets):
+            pattern = self._patterns[(analysis, name)] = SparsityPattern(triplets)
+        return pattern
+
+    def solver(self, analysis:Analysis, name:str) -> Solver:
+        """New solver (of the backend Circuit.solver) for the matrices named (analysis, name).
+
+        name is the one the matrices are assembled with by matrix() (or
+        pattern()), matrices built otherwise get a name of their own. So all
+        solvers of a key factorize the same sparsity pattern and share their
+        cache, the ordering of the pattern is computed once for all analyses
+        of the topology.
+        """
+        solver = self.circuit.solver()
+        solver.cache = self._solver_caches.setdefault((analysis, name), {})
+        return solver
+
+    def matrix(self, analysis:Analysis, name:str, triplets:TripletMatrix) -> csc_matrix:
+        """Assemble triplets, reusing the sparsity pattern cached under (analysis, name)"""
+        with profiling.phase("assemble"):
+            return self.pattern(analysis, name, triplets).assemble(triplets)
+
+    def stamp_op(self) -> tuple[list, TripletMatrix, np.ndarray]:
+        layout = self.layout(Analysis.OP)
+        dimension = layout.dimension
+
+        m = self._triplets(Analysis.OP, "m")
+        # The last entry collects the contributions to ground (GND_INDEX)
+        b = np.zeros(dimension+1, dtype=np.float64)
+        with profiling.phase("stamp"):
+            x = self._stamp(layout, "apply_op_matrix", m, b=b)
+
+        return x, m, b[:dimension]
+
+    def assemble_op(self) -> tuple[list, csc_matrix, np.ndarray]:
+        x, m, b = self.stamp_op()
+        return x, self.matrix(Analysis.OP, "m", m), b
+
+    def stamp_tran(self) -> tuple[list, TripletMatrix, TripletMatrix, np.ndarray]:
+        layout = self.layout(Analysis.TRANSIENT)
+        dimension = layout.dimension
+
+        g = self._triplets(Analysis.TRANSIENT, "g")
+        c = self._triplets(Analysis.TRANSIENT, "c")
+        # The last entry collects the contributions to ground (GND_INDEX)
+        b = np.zeros(dimension+1, dtype=np.float64)
+        with profiling.phase("stamp"):
+            x = self._stamp(layout, "apply_tran_matrix", g, c, b=b)
+
+        return x, g, c, b[:dimension]
+
+    def stamp_ac(self) -> np.ndarray:
+        """Right hand side of the AC analysis, which uses the transient layout"""
+        layout = self.layout(Analysis.TRANSIENT)
+        dimension = layout.dimension
+
+        # The last entry collects the contributions to ground (GND_INDEX)
+        b = np.zeros(dimension+1, dtype=np.complex128)
+        for component, index in zip(self.circuit.components, layout.indices):
+            component.apply_ac_excitation(self.factory, index, b)
+
+        return b[:dimension]
+
+    def stamp_nonlinear(self, analysis:Analysis, solution:np.ndarray) -> TripletMatrix:
+        """Jacobian of the nonlinear components at solution (small signal model)"""
+        layout = self.layout(analysis)
+        dimension = layout.dimension
+
+        m = TripletMatrix((dimension, dimension), capacity=4*len(layout.nonlinear)+1)
+        b = np.zeros(dimension+1, dtype=np.float64)
+        padded = np.zeros(dimension+1, dtype=np.float64)
+        padded[:dimension] = solution
+        for component, index in layout.nonlinear:
+            component.apply_nonlinear_matrix(self.factory, index, m, b, padded, {})
+        return m
+
+    def assemble_tran(self) -> tuple[list, csc_matrix, csc_matrix, np.ndarray]:
+        x, g, c, b = self.stamp_tran()
+        return (x,
+                self.matrix(Analysis.TRANSIENT, "g", g),
+                self.matrix(Analysis.TRANSIENT, "c", c),
+                b)
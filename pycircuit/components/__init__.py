@@ -4,4 +4,4 @@ from .c import C
 from .idc import IDC
 from .mos import MOS
 from .d import D
-from .component import Component, Port, GND, Analysis, CurrentPort
\ No newline at end of file
+from .component import Component, ComponentGroup, Port, GND, Analysis, CurrentPort
\ No newline at end of file
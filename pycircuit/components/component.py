@@ -1,40 +1,65 @@
 from __future__ import annotations
+import copyreg
 from abc import ABC
-from dataclasses import dataclass, field
-from typing import Self
-from sympy import Matrix
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Self
 from enum import Enum, auto
 import numpy as np
 
-@dataclass
+from ..matrix import TripletMatrix
+
+if TYPE_CHECKING:
+    from sympy import Matrix
+
+@dataclass(eq=False, slots=True)
 class Port:
+    """Terminal of a component, connected to other ports with <<.
+
+    Ports compare and hash by identity. They are slotted, a circuit holds
+    one per terminal of every component.
+    """
     name:str
     parent: Component | None
-    connections:list[Self] = field(default_factory=list)
-
-    def __hash__(self) -> int:
-        return id(self)
+    connections:list[Self] | tuple = ()
+    """Ports connected with <<. Ports without a component (GND) do not record
+    their connections, so they do not collect (and keep alive) the ports of
+    every circuit. Unconnected ports share the empty tuple."""
 
     def __lshift__(self, other_port:Self)->Self:
-        other_port.connections.append(self)
-        self.connections.append(other_port)
+        for port, other in ((self, other_port), (other_port, self)):
+            if port.parent is None and other.parent is not None:
+                continue
+            if port.connections:
+                port.connections.append(other)
+            else:
+                port.connections = [other]
         return self
 
     def __rshift__(self, other_port:Self)->Self:
         self.__lshift__(other_port)
         return other_port
 
+    def __reduce__(self):
+        """GND is pickled by reference. The connections are left out, through
+        them the ports of a circuit form chains as long as the circuit, which
+        exceed the recursion limit of pickle. Circuit restores them."""
+        if self is GND:
+            return "GND"
+        state = {port_field.name: getattr(self, port_field.name) for port_field in fields(self)}
+        state["connections"] = ()
+        return copyreg.__newobj__, (type(self),), (None, state)
+
     def __repr__(self) -> str:
         if not self.parent:
             return self.name
 
         return f"{self.parent.name}.{self.name}"
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class CurrentPort(Port):
     dc : float = 0.0
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class VoltagePort(Port):
     dc : float = 0.0
 
@@ -45,7 +70,34 @@ class Analysis(Enum):
     TRANSIENT = auto()
     OP = auto()
 
+@dataclass(eq=False)
+class ComponentGroup:
+    """Components of one class that are stamped together (struct of arrays)"""
+    components: list[Component]
+    indices: np.ndarray
+    """Index of the first additional row/column of each component (-1 if it has none)"""
+    _nodes: dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.components)
+
+    def nodes(self, factory, port:str) -> np.ndarray:
+        """Net.index of the net at port of each component, the topology is fixed so it is cached"""
+        nodes = self._nodes.get(port)
+        if nodes is None:
+            nodes = self._nodes[port] = np.array([factory.get_net_of(component.ports[port]).index
+                                                  for component in self.components], dtype=np.intp)
+        return nodes
+
+    def values(self, name:str) -> np.ndarray:
+        """Current values of the parameter name of each component"""
+        return np.array([getattr(component, name) for component in self.components], dtype=np.float64)
+
 class Component(ABC):
+
+    rhs_parameters : tuple[str, ...] = ()
+    """Parameters that enter only (and linearly) the right hand side of the OP analysis"""
+
     def __init__(self, name:str):
         self.name = name
         self.ports : dict[str, Port] = {}
@@ -57,24 +109,67 @@ class Component(ABC):
     def __getitem__(self, port_name:str)->Port:
         return self.ports[port_name]
 
-    def apply_tran_matrix(self, factory, index:int, g:np.ndarray, c:np.ndarray, x:list, b:np.ndarray, dimension:int):
+    def apply_tran_matrix(self, factory, index:int, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         for name, port in self.ports.items():
             if isinstance(port, CurrentPort):
                 net = factory.get_net_of(port)
-                b[net.net_id] += port.dc
+                b[net.index] += port.dc
             else:
                 raise NotImplementedError(f"You have to specify all ports correctly for transient analysis or overwrite apply_tran_matrix() method.")
 
-    def apply_op_matrix(self, factory, index:int, m:np.ndarray, x:list, b:np.ndarray, dimension:int):
+    def apply_op_matrix(self, factory, index:int, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         for name, port in self.ports.items():
             if isinstance(port, CurrentPort):
                 net = factory.get_net_of(port)
-                b[net.net_id] += port.dc
+                b[net.index] += port.dc
             else:
                 raise NotImplementedError(f"You have to specify all ports correctly for OP analysis or overwrite apply_op_matrix() method.")
 
+    @classmethod
+    def has_group_stamps(cls, method:str)->bool:
+        """True if cls implements method (e.g. "apply_op_matrix") for whole groups as
+        method + "_group". Subclasses overriding method are stamped per instance."""
+        def owner(name:str)->type:
+            return next(base for base in cls.__mro__ if name in vars(base))
+        group_owner = owner(method + "_group")
+        return group_owner is not Component and issubclass(group_owner, owner(method))
+
+    @classmethod
+    def apply_tran_matrix_group(cls, factory, group:ComponentGroup, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        """apply_tran_matrix() of all components of group with NumPy array operations"""
+        for component, index in zip(group.components, group.indices):
+            component.apply_tran_matrix(factory, int(index), g, c, x, b, dimension)
+
+    @classmethod
+    def apply_op_matrix_group(cls, factory, group:ComponentGroup, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        """apply_op_matrix() of all components of group with NumPy array operations"""
+        for component, index in zip(group.components, group.indices):
+            component.apply_op_matrix(factory, int(index), m, x, b, dimension)
+
+    def apply_ac_excitation(self, factory, index:int, b:np.ndarray):
+        """Small signal sources of the AC analysis. The matrix stamps of the AC analysis are
+        the ones of apply_tran_matrix(), index is the one of the transient analysis"""
+        pass
+
     def apply_symbolic_matrix(self, factory, index:int, m:Matrix, x:list, b:Matrix, dimension:int):
         raise NotImplementedError(f"Symbolic analysis is not implemented for {self}")
 
-    def update(self, factory, t:float, dt:float, signals:np.ndarray, g:np.ndarray, c:np.ndarray, x:list, b:np.ndarray):
+    def is_nonlinear(self)->bool:
+        """True if the component has to be solved with Newton-Raphson iterations"""
+        return type(self).apply_nonlinear_matrix is not Component.apply_nonlinear_matrix
+
+    def apply_nonlinear_matrix(self, factory, index:int, m:TripletMatrix, b:np.ndarray, solution:np.ndarray, state:dict)->bool:
+        """Stamp the companion model of a nonlinear component, i.e. its Jacobian into m and the
+        equivalent current (Jacobian*solution - current) into b, linearised at the Newton iterate solution.
+        state is kept during one Newton solve (e.g. for voltage limiting).
+        Returns True if the step was limited, which prevents convergence in this iteration."""
+        return False
+
+    def is_dynamic(self)->bool:
+        """True if the component changes the system during a transient simulation"""
+        return type(self).update is not Component.update
+
+    def update(self, factory, t:float, dt:float, signals:np.ndarray, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray):
+        """Called before each transient time step. signals and b are indexed with Net.index,
+        their last entry belongs to ground"""
         pass
\ No newline at end of file
@@ -1,7 +1,18 @@
 from .component import Component, Port
-from sympy import Matrix, symbols
+import math
+import numpy as np
+
+from ..matrix import TripletMatrix
+
+BOLTZMANN = 1.380649e-23
+ELEMENTARY_CHARGE = 1.602176634e-19
 
 class D(Component):
+    """Shockley diode, I = Is*(exp(V/(n*Vt)) - 1)"""
+
+    gmin = 1e-12
+    """Conductance in parallel to the junction, keeps the matrix regular in reverse bias"""
+
     def __init__(self, name: str, reverse_bias_saturation_current:float|str, ideality_factor:float|str, temperature_kelvin:float|str=293.0):
         super().__init__(name)
 
@@ -11,46 +22,58 @@ class D(Component):
         self.ports["p"] = Port(name="p", parent=self)
         self.ports["n"] = Port(name="n", parent=self)
 
+    @property
+    def thermal_voltage(self)->float:
+        """n*k*T/q"""
+        return self.ideality_factor*BOLTZMANN*self.temperature_kelvin/ELEMENTARY_CHARGE
 
-    def apply_tran_matrix(self, factory, index:int, g:Matrix, c:Matrix, x:list, b:Matrix, dimension:int):
-        """A capacitor behaves like a voltage source of voltage self.dc"""
+    def current(self, voltage:float)->tuple[float, float]:
+        """Current and conductance of the junction at voltage"""
+        vt = self.thermal_voltage
+        e = math.exp(voltage/vt)
+        i_s = self.reverse_bias_saturation_current
+        return i_s*(e - 1) + self.gmin*voltage, i_s*e/vt + self.gmin
 
-        net_n = factory.get_net_of(self.ports["n"])
-        net_p = factory.get_net_of(self.ports["p"])
+    def limit(self, voltage:float, last_voltage:float)->float:
+        """Limit the junction voltage step of a Newton iteration (SPICE pnjlim)"""
+        vt = self.thermal_voltage
+        vcrit = vt*math.log(vt/(math.sqrt(2)*self.reverse_bias_saturation_current))
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        if voltage > vcrit and abs(voltage - last_voltage) > 2*vt:
+            if last_voltage > 0:
+                arg = 1 + (voltage - last_voltage)/vt
+                return last_voltage + vt*math.log(arg) if arg > 0 else vcrit
+            return vt*math.log(voltage/vt)
+        return voltage
 
-        g[id_p, id_p] +=  1/self.value
-        g[id_n, id_n] +=  1/self.value
-        g[id_p, id_n] += -1/self.value
-        g[id_n, id_p] += -1/self.value
+    def apply_tran_matrix(self, factory, index:int, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        """The diode is only stamped in apply_nonlinear_matrix()"""
+        pass
 
-    def apply_op_matrix(self, factory, index:int, m:Matrix, x:list, b:Matrix, dimension:int):
-        """A capacitor behaves like a voltage source of voltage self.dc"""
+    def apply_op_matrix(self, factory, index:int, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        """The diode is only stamped in apply_nonlinear_matrix()"""
+        pass
+
+    def apply_nonlinear_matrix(self, factory, index:int, m:TripletMatrix, b:np.ndarray, solution:np.ndarray, state:dict)->bool:
 
         net_n = factory.get_net_of(self.ports["n"])
         net_p = factory.get_net_of(self.ports["p"])
 
-        id_n, id_p = net_n.net_id, net_p.net_id
-
-        m[id_p, id_p] +=  1/self.value
-        m[id_n, id_n] +=  1/self.value
-        m[id_p, id_n] += -1/self.value
-        m[id_n, id_p] += -1/self.value
-
+        id_n, id_p = net_n.index, net_p.index
 
-    def apply_symbolic_matrix(self, factory, index:int,   m:Matrix, x:list, b:Matrix, dimension:int):
+        voltage = solution[id_p] - solution[id_n]
+        limited_voltage = self.limit(voltage, state.get(self, voltage))
+        state[self] = limited_voltage
 
-        value = self.value
-        if isinstance(self.value, str):
-            value = symbols(self.value)
+        current, conductance = self.current(limited_voltage)
+        current_eq = conductance*limited_voltage - current
 
-        net_n = factory.get_net_of(self.ports["n"])
-        net_p = factory.get_net_of(self.ports["p"])
+        m.add(id_p, id_p, conductance)
+        m.add(id_n, id_n, conductance)
+        m.add(id_p, id_n, -conductance)
+        m.add(id_n, id_p, -conductance)
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        b[id_p] += current_eq
+        b[id_n] -= current_eq
 
-        m[id_p, id_p] += 1/value
-        m[id_n, id_n] += 1/value
-        m[id_p, id_n] += -1/value
-        m[id_n, id_p] += -1/value
+        return limited_voltage != voltage
@@ -1,7 +1,17 @@
-from .component import Component, Port, Analysis
-from sympy import Matrix, symbols
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from .component import Component, ComponentGroup, Port, Analysis
+import numpy as np
+
+from ..matrix import TripletMatrix
+
+if TYPE_CHECKING:
+    from sympy import Matrix
 
 class IDC(Component):
+
+    rhs_parameters = ("dc",)
+
     def __init__(self, name: str, dc:float|str):
         super().__init__(name)
 
@@ -13,6 +23,7 @@ class IDC(Component):
         return 0
 
     def apply_symbolic_matrix(self, factory, index:int, m:Matrix, x:list, b:Matrix, dimension:int):
+        from sympy import symbols
 
         dc = self.dc
         if isinstance(self.dc, str):
@@ -27,27 +38,39 @@ class IDC(Component):
         b[id_n] -= dc
 
 
-    def apply_tran_matrix(self, factory, index:int, g:Matrix, c:Matrix, x:list, b:Matrix, dimension:int):
+    def apply_tran_matrix(self, factory, index:int, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         """A capacitor behaves like a voltage source of voltage self.dc"""
 
         net_n = factory.get_net_of(self.ports["n"])
         net_p = factory.get_net_of(self.ports["p"])
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        id_n, id_p = net_n.index, net_p.index
 
-        b[id_p, 0] += self.dc
-        b[id_n, 0] -= self.dc
+        b[id_p] += self.dc
+        b[id_n] -= self.dc
 
-    def apply_op_matrix(self, factory, index:int, m:Matrix, x:list, b:Matrix, dimension:int):
+    def apply_op_matrix(self, factory, index:int, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         """A capacitor behaves like a voltage source of voltage self.dc"""
 
         net_n = factory.get_net_of(self.ports["n"])
         net_p = factory.get_net_of(self.ports["p"])
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        id_n, id_p = net_n.index, net_p.index
 
-        b[id_p, 0] += self.dc
-        b[id_n, 0] -= self.dc
+        b[id_p] += self.dc
+        b[id_n] -= self.dc
 
+    @classmethod
+    def _stamp_group(cls, factory, group:ComponentGroup, b:np.ndarray):
+        dc = group.values("dc")
+        # Several sources may share a net (and ground is the last entry)
+        np.add.at(b, group.nodes(factory, "p"), dc)
+        np.subtract.at(b, group.nodes(factory, "n"), dc)
 
+    @classmethod
+    def apply_tran_matrix_group(cls, factory, group:ComponentGroup, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        cls._stamp_group(factory, group, b)
 
+    @classmethod
+    def apply_op_matrix_group(cls, factory, group:ComponentGroup, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        cls._stamp_group(factory, group, b)
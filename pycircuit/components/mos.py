@@ -1,5 +1,12 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from .component import Component, Port
-from sympy import Matrix, symbols
+import numpy as np
+
+from ..matrix import TripletMatrix
+
+if TYPE_CHECKING:
+    from sympy import Matrix
 
 class MOS(Component):
     def __init__(self, name: str, gm:float|str|None=None, gds:float|str|None=None, gmb:float|str|None=None):
@@ -14,7 +21,36 @@ class MOS(Component):
         self.ports["s"] = Port(name="s", parent=self)
         self.ports["b"] = Port(name="b", parent=self)
 
+    def _stamp(self, factory, m:TripletMatrix):
+        """Small signal model, a voltage controlled current source gm and the output conductance gds"""
+
+        if self.gm is None or isinstance(self.gm, str) or isinstance(self.gds, str):
+            raise ValueError(f"{self.name}: numeric values of gm and gds are required")
+
+        id_g = factory.get_net_of(self.ports["g"]).index
+        id_d = factory.get_net_of(self.ports["d"]).index
+        id_s = factory.get_net_of(self.ports["s"]).index
+
+        if self.gds is not None:
+            m.add(id_d, id_d, self.gds)
+            m.add(id_s, id_s, self.gds)
+            m.add(id_d, id_s, -self.gds)
+            m.add(id_s, id_d, -self.gds)
+
+        # Drain current gm*(vg - vs) flows from d to s
+        m.add(id_d, id_g, self.gm)
+        m.add(id_s, id_g, -self.gm)
+        m.add(id_d, id_s, -self.gm)
+        m.add(id_s, id_s, self.gm)
+
+    def apply_tran_matrix(self, factory, index:int, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        self._stamp(factory, g)
+
+    def apply_op_matrix(self, factory, index:int, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        self._stamp(factory, m)
+
     def apply_symbolic_matrix(self, factory, index:int,   m:Matrix, x:list, b:Matrix, dimension:int):
+        from sympy import symbols
 
         gm = self.gm
         if isinstance(self.gm, str):
@@ -1,5 +1,12 @@
-from .component import Component, Port
-from sympy import Matrix, symbols
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from .component import Component, ComponentGroup, Port
+import numpy as np
+
+from ..matrix import TripletMatrix
+
+if TYPE_CHECKING:
+    from sympy import Matrix
 
 class R(Component):
     def __init__(self, name: str, value:float|str):
@@ -10,34 +17,43 @@ class R(Component):
         self.ports["n"] = Port(name="n", parent=self)
 
 
-    def apply_tran_matrix(self, factory, index:int, g:Matrix, c:Matrix, x:list, b:Matrix, dimension:int):
+    def apply_tran_matrix(self, factory, index:int, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         """A capacitor behaves like a voltage source of voltage self.dc"""
 
         net_n = factory.get_net_of(self.ports["n"])
         net_p = factory.get_net_of(self.ports["p"])
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        id_n, id_p = net_n.index, net_p.index
 
-        g[id_p, id_p] +=  1/self.value
-        g[id_n, id_n] +=  1/self.value
-        g[id_p, id_n] += -1/self.value
-        g[id_n, id_p] += -1/self.value
+        g.add(id_p, id_p, 1/self.value)
+        g.add(id_n, id_n, 1/self.value)
+        g.add(id_p, id_n, -1/self.value)
+        g.add(id_n, id_p, -1/self.value)
 
-    def apply_op_matrix(self, factory, index:int, m:Matrix, x:list, b:Matrix, dimension:int):
+    def apply_op_matrix(self, factory, index:int, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         """A capacitor behaves like a voltage source of voltage self.dc"""
 
         net_n = factory.get_net_of(self.ports["n"])
         net_p = factory.get_net_of(self.ports["p"])
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        id_n, id_p = net_n.index, net_p.index
+
+        m.add(id_p, id_p, 1/self.value)
+        m.add(id_n, id_n, 1/self.value)
+        m.add(id_p, id_n, -1/self.value)
+        m.add(id_n, id_p, -1/self.value)
+
+    @classmethod
+    def apply_tran_matrix_group(cls, factory, group:ComponentGroup, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        g.add_branches(group.nodes(factory, "p"), group.nodes(factory, "n"), 1/group.values("value"))
 
-        m[id_p, id_p] +=  1/self.value
-        m[id_n, id_n] +=  1/self.value
-        m[id_p, id_n] += -1/self.value
-        m[id_n, id_p] += -1/self.value
+    @classmethod
+    def apply_op_matrix_group(cls, factory, group:ComponentGroup, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        m.add_branches(group.nodes(factory, "p"), group.nodes(factory, "n"), 1/group.values("value"))
 
 
     def apply_symbolic_matrix(self, factory, index:int,   m:Matrix, x:list, b:Matrix, dimension:int):
+        from sympy import symbols
 
         value = self.value
         if isinstance(self.value, str):
@@ -1,7 +1,17 @@
-from .component import Component, Port, Analysis
-from sympy import Matrix, symbols
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from .component import Component, ComponentGroup, Port, Analysis
+import numpy as np
+
+from ..matrix import TripletMatrix
+
+if TYPE_CHECKING:
+    from sympy import Matrix
 
 class VDC(Component):
+
+    rhs_parameters = ("dc",)
+
     def __init__(self, name: str, dc:float=0.0, ac:float|str=0.0):
         super().__init__(name)
 
@@ -14,6 +24,7 @@ class VDC(Component):
         return 1
 
     def apply_symbolic_matrix(self, factory, index:int, m:Matrix, x:list, b:Matrix, dimension:int):
+        from sympy import symbols
 
         ac = self.ac
         if isinstance(self.ac, str):
@@ -34,39 +45,68 @@ class VDC(Component):
         x.append(symbols(f"I{id_n}_{id_p}"))
 
 
-    def apply_tran_matrix(self, factory, index:int, g:Matrix, c:Matrix, x:list, b:Matrix, dimension:int):
+    def apply_ac_excitation(self, factory, index:int, b:np.ndarray):
+        if isinstance(self.ac, str):
+            raise ValueError(f"{self.name}: a numeric ac value is required for AC analysis")
+        b[index] = self.ac
+
+    def apply_tran_matrix(self, factory, index:int, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         """A capacitor behaves like a voltage source of voltage self.dc"""
 
         net_n = factory.get_net_of(self.ports["n"])
         net_p = factory.get_net_of(self.ports["p"])
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        id_n, id_p = net_n.index, net_p.index
 
-        g[index, id_p] += 1
-        g[index, id_n] += -1
-        g[id_p, index] += -1
-        g[id_n, index] += 1
+        g.add(index, id_p, 1)
+        g.add(index, id_n, -1)
+        g.add(id_p, index, -1)
+        g.add(id_n, index, 1)
 
         b[index] = self.dc
 
-        x.append(symbols(f"I{id_n}_{id_p}"))
+        x.append(f"I{net_n.net_id}_{net_p.net_id}")
 
-    def apply_op_matrix(self, factory, index:int, m:Matrix, x:list, b:Matrix, dimension:int):
+    def apply_op_matrix(self, factory, index:int, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
         """A capacitor behaves like a voltage source of voltage self.dc"""
 
         net_n = factory.get_net_of(self.ports["n"])
         net_p = factory.get_net_of(self.ports["p"])
 
-        id_n, id_p = net_n.net_id, net_p.net_id
+        id_n, id_p = net_n.index, net_p.index
 
-        m[index, id_p] += 1
-        m[index, id_n] += -1
-        m[id_p, index] += -1
-        m[id_n, index] += 1
+        m.add(index, id_p, 1)
+        m.add(index, id_n, -1)
+        m.add(id_p, index, -1)
+        m.add(id_n, index, 1)
 
         b[index] = self.dc
 
-        x.append(symbols(f"I{id_n}_{id_p}"))
+        x.append(f"I{net_n.net_id}_{net_p.net_id}")
+
+    @classmethod
+    def _stamp_group(cls, factory, group:ComponentGroup, m:TripletMatrix, x:list, b:np.ndarray):
+        id_p, id_n, index = group.nodes(factory, "p"), group.nodes(factory, "n"), group.indices
+
+        m.add_array(index, id_p, 1)
+        m.add_array(index, id_n, -1)
+        m.add_array(id_p, index, -1)
+        m.add_array(id_n, index, 1)
+
+        b[index] = group.values("dc")
+
+        for component in group.components:
+            net_n = factory.get_net_of(component.ports["n"])
+            net_p = factory.get_net_of(component.ports["p"])
+            x.append(f"I{net_n.net_id}_{net_p.net_id}")
+
+    @classmethod
+    def apply_tran_matrix_group(cls, factory, group:ComponentGroup, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        cls._stamp_group(factory, group, g, x, b)
+
+    @classmethod
+    def apply_op_matrix_group(cls, factory, group:ComponentGroup, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        cls._stamp_group(factory, group, m, x, b)
 
 
 
@@ -0,0 +1,148 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy.sparse import coo_matrix, csc_matrix, csr_matrix
+
+GND_INDEX = -1
+"""Matrix index of the ground net. Stamps into ground rows/columns are dropped
+and vectors carry one extra trailing entry that collects them."""
+
+class TripletMatrix:
+    """Sparse matrix under construction, stored as (row, col, value) triplets.
+
+    Components stamp their contributions with add(). The triplets are kept in
+    preallocated NumPy buffers (grown by doubling) and converted to a sparse
+    matrix only once, duplicates being summed up during the conversion.
+    """
+
+    def __init__(self, shape:tuple[int, int], capacity:int=64, dtype=np.float64) -> None:
+        self.shape = shape
+        self.count = 0
+        self.rows = np.empty(capacity, dtype=np.intp)
+        self.cols = np.empty(capacity, dtype=np.intp)
+        self.values = np.empty(capacity, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _grow(self, required:int):
+        capacity = max(2*len(self.values), required)
+        for name in ("rows", "cols", "values"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, row:int, col:int, value:float):
+        """Add value to the entry (row, col), stamps into ground are ignored"""
+        if row < 0 or col < 0:
+            return
+        i = self.count
+        if i == len(self.values):
+            self._grow(i+1)
+        self.rows[i] = row
+        self.cols[i] = col
+        self.values[i] = value
+        self.count = i + 1
+
+    def add_array(self, rows:np.ndarray, cols:np.ndarray, values:np.ndarray|float):
+        """Vectorized add(), stamps into ground are ignored"""
+        rows, cols, values = np.broadcast_arrays(rows, cols, values)
+        keep = (rows >= 0) & (cols >= 0)
+        n = int(np.count_nonzero(keep))
+        i = self.count
+        if i + n > len(self.values):
+            self._grow(i + n)
+        self.rows[i:i+n] = rows[keep]
+        self.cols[i:i+n] = cols[keep]
+        self.values[i:i+n] = values[keep]
+        self.count = i + n
+
+    def add_branches(self, id_p:np.ndarray, id_n:np.ndarray, values:np.ndarray):
+        """Stamp two terminal admittances values between the nodes id_p and id_n"""
+        self.add_array(np.concatenate((id_p, id_n, id_p, id_n)),
+                       np.concatenate((id_p, id_n, id_n, id_p)),
+                       np.concatenate((values, values, -values, -values)))
+
+    def clear(self):
+        """Remove all triplets but keep the allocated buffers"""
+        self.count = 0
+
+    def extend(self, other:"TripletMatrix", scale:float=1.0):
+        """Append the triplets of other, with the values multiplied by scale"""
+        i, n = self.count, other.count
+        if i + n > len(self.values):
+            self._grow(i + n)
+        self.rows[i:i+n] = other.rows[:n]
+        self.cols[i:i+n] = other.cols[:n]
+        self.values[i:i+n] = other.values[:n]
+        if scale != 1.0:
+            self.values[i:i+n] *= scale
+        self.count = i + n
+
+    def truncate(self, count:int):
+        """Keep only the first count triplets"""
+        self.count = min(self.count, count)
+
+    def copy(self, capacity:int=0) -> "TripletMatrix":
+        n = self.count
+        other = TripletMatrix(self.shape, capacity=max(capacity, n, 1), dtype=self.values.dtype)
+        other.rows[:n] = self.rows[:n]
+        other.cols[:n] = self.cols[:n]
+        other.values[:n] = self.values[:n]
+        other.count = n
+        return other
+
+    def tocoo(self) -> coo_matrix:
+        from scipy.sparse import coo_matrix
+
+        n = self.count
+        return coo_matrix((self.values[:n], (self.rows[:n], self.cols[:n])), shape=self.shape)
+
+    def tocsc(self) -> csc_matrix:
+        return self.tocoo().tocsc()
+
+    def tocsr(self) -> csr_matrix:
+        return self.tocoo().tocsr()
+
+
+class SparsityPattern:
+    """CSC structure of a set of stamps.
+
+    As long as the components stamp the same (row, col) sequence, which is the
+    case if only parameter values change, the matrix can be assembled from the
+    cached structure without sorting the triplets again.
+    """
+
+    def __init__(self, triplets:TripletMatrix) -> None:
+        n = triplets.count
+        self.shape = triplets.shape
+        self.rows = triplets.rows[:n].copy()
+        self.cols = triplets.cols[:n].copy()
+
+        keys = self.cols*self.shape[0] + self.rows
+        unique, self.positions = np.unique(keys, return_inverse=True)
+        self.nnz = len(unique)
+        self.indices = (unique % self.shape[0]).astype(np.int32)
+        self.indptr = np.searchsorted(unique // self.shape[0], np.arange(self.shape[1]+1)).astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def matches(self, triplets:TripletMatrix) -> bool:
+        n = triplets.count
+        return (triplets.shape == self.shape and n == len(self.rows)
+                and np.array_equal(triplets.rows[:n], self.rows)
+                and np.array_equal(triplets.cols[:n], self.cols))
+
+    def data(self, triplets:TripletMatrix) -> np.ndarray:
+        """Values of the stamps summed up into the CSC data array"""
+        return np.bincount(self.positions, weights=triplets.values[:triplets.count], minlength=self.nnz)
+
+    def assemble(self, triplets:TripletMatrix) -> csc_matrix:
+        from scipy.sparse import csc_matrix
+
+        return csc_matrix((self.data(triplets), self.indices, self.indptr), shape=self.shape)
@@ -0,0 +1,135 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.context import BaseContext
+
+import numpy as np
+
+from .components import Analysis, Component
+from .newton import solve_newton
+
+
+@dataclass
+class Normal:
+    mean: float
+    sigma: float
+
+    def sample(self, rng:np.random.Generator, size:int)->np.ndarray:
+        return rng.normal(self.mean, self.sigma, size)
+
+
+@dataclass
+class Uniform:
+    low: float
+    high: float
+
+    def sample(self, rng:np.random.Generator, size:int)->np.ndarray:
+        return rng.uniform(self.low, self.high, size)
+
+
+def _solve_samples(circuit, compiled, parameters:list[tuple[Component, str]], values:np.ndarray)->np.ndarray:
+    """OP for each column of values, values[i] is the value of parameters[i]"""
+    nonlinear = compiled.layout(Analysis.OP).nonlinear
+    lu = compiled.solver(Analysis.OP, "jacobian" if nonlinear else "m")
+    answ = None
+
+    originals = [getattr(component, name) for component, name in parameters]
+    try:
+        for sample in range(values.shape[1]):
+            for (component, name), value in zip(parameters, values[:, sample]):
+                setattr(component, name, value)
+
+            if nonlinear:
+                x, m, b = compiled.stamp_op()
+                solution = solve_newton(compiled, Analysis.OP, m, b, np.zeros(len(x)), lu, circuit.newton)
+            else:
+                x, m, b = compiled.assemble_op()
+                lu.factorize(m)
+                solution = lu.solve(b)
+
+            if answ is None:
+                answ = np.empty((len(x), values.shape[1]), dtype=np.float64, order="F")
+            answ[:, sample] = solution
+    finally:
+        for (component, name), value in zip(parameters, originals):
+            setattr(component, name, value)
+
+    return answ
+
+
+# Compiled circuit of a pool worker, sent once when the worker starts
+_worker = None
+
+def _init_worker(compiled, parameters:list[tuple[int, str]]):
+    global _worker
+    components = compiled.circuit.components
+    _worker = (compiled, [(components[i], name) for i, name in parameters])
+
+def _solve_chunk(values:np.ndarray)->np.ndarray:
+    compiled, parameters = _worker
+    return _solve_samples(compiled.circuit, compiled, parameters, values)
+
+
+class MonteCarlo:
+    """Statistical and corner analysis of the OP over component parameters.
+
+    parameters maps (component, parameter name) to a distribution, e.g.
+    {(r1, "value"): Normal(1e3, 10)}. The circuit is compiled once; the
+    samples are drawn up front from a seeded generator and solved in chunks by
+    a process pool, each worker receiving the compiled topology only once.
+    mp_context is the multiprocessing context of the pool (e.g.
+    multiprocessing.get_context("spawn")), None uses the default start method.
+    """
+
+    def __init__(self, circuit, parameters:dict[tuple[Component, str], Normal|Uniform], factory=None,
+                 mp_context:BaseContext|None=None) -> None:
+        self.circuit = circuit
+        self.parameters = parameters
+        self.factory = factory
+        self.mp_context = mp_context
+
+    def sample(self, samples:int, seed:int|None=None)->np.ndarray:
+        """Parameter values, one row per parameter and one column per sample"""
+        rng = np.random.default_rng(seed)
+        return np.array([distribution.sample(rng, samples) for distribution in self.parameters.values()],
+                        dtype=np.float64).reshape(len(self.parameters), samples)
+
+    def run(self, samples:int, seed:int|None=None, workers:int|None=None,
+            chunksize:int|None=None)->tuple[list, np.ndarray, np.ndarray]:
+        """Returns the variable names, the parameter values (parameters x samples)
+        and the results (variables x samples)"""
+        values = self.sample(samples, seed)
+        x, answ = self.solve(values, workers, chunksize)
+        return x, values, answ
+
+    def run_corners(self, corners:list[dict[tuple[Component, str], float]], workers:int|None=None,
+                    chunksize:int|None=None)->tuple[list, np.ndarray, np.ndarray]:
+        """Like run(), for given parameter combinations. Parameters missing in a
+        corner keep their current value."""
+        values = np.array([[corner.get(key, getattr(*key)) for corner in corners] for key in self.parameters],
+                          dtype=np.float64).reshape(len(self.parameters), len(corners))
+        x, answ = self.solve(values, workers, chunksize)
+        return x, values, answ
+
+    def solve(self, values:np.ndarray, workers:int|None=None, chunksize:int|None=None)->tuple[list, np.ndarray]:
+        compiled = self.circuit.compile(self.factory)
+        x = compiled.assemble_op()[0]
+        parameters = list(self.parameters)
+        samples = values.shape[1]
+
+        workers = workers or os.cpu_count() or 1
+        chunksize = chunksize or max(1, math.ceil(samples/(4*workers)))
+        chunks = [values[:, start:start+chunksize] for start in range(0, samples, chunksize)]
+
+        if workers == 1 or len(chunks) <= 1:
+            return x, _solve_samples(self.circuit, compiled, parameters, values)
+
+        components = self.circuit.components
+        indices = [(next(i for i, c in enumerate(components) if c is component), name) for component, name in parameters]
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=self.mp_context, initializer=_init_worker,
+                                 initargs=(compiled, indices)) as executor:
+            results = list(executor.map(_solve_chunk, chunks))
+
+        return x, np.concatenate(results, axis=1)
@@ -1,68 +1,170 @@
+from collections.abc import Iterable
 
-from dataclasses import dataclass, field
 from ..components  import Port, GND
+from ..matrix import GND_INDEX
 
 class Net:
+    __slots__ = ("name", "ports", "net_id", "index", "gnd")
 
     def __init__(self, ports:list[Port]) -> None:
         self.name : str = ""
         self.ports: list[Port] = ports
         self.net_id : int = -1
+        self.index : int = GND_INDEX
+        """Row/column of the net in the system matrix (GND_INDEX for ground)"""
+        self.gnd : bool = GND in ports
+        """The net contains GND, kept up to date when ports are added"""
 
     def __repr__(self) -> str:
         return f"Net({self.name}, {[(x.parent.name if x.parent else 'GND')+'.'+x.name for x in self.ports]})"
 
     def is_gnd(self)->bool:
-        for port in self.ports:
-            if port is GND:
-                return True
-        return False
+        return self.gnd
 
 
 
 class NetFactory:
+    """Builds nets out of port connections.
+
+    Every connected port gets an integer id. The nets are kept in a
+    disjoint-set (union-find) structure over these ids, stored in flat lists,
+    so that looking up the net of a port and merging two nets are (nearly)
+    constant time operations.
+    """
 
     def __init__(self) -> None:
-        self.nets: list[Net] = []
+        self._ids: dict[Port, int] = {}
+        """Id of each connected port"""
+        self._parent: list[int] = []
+        """Union-find parent of each id, roots point to themselves"""
+        self._net_of_root: list[Net|None] = []
+        """Net of each root id (None for ids that are not a root)"""
+        self._nets: dict[Net, None] = {}
+        """All nets in creation order (used as an ordered set)"""
+        self._nets_list: list[Net] | None = None
+        self.num_nodes : int = 0
+        """Number of non-ground nets, i.e. node voltages in the system matrix"""
+
+    @property
+    def nets(self) -> list[Net]:
+        if self._nets_list is None:
+            self._nets_list = list(self._nets)
+        return self._nets_list
 
     def get(self, name:str)->Net|None:
-        for net in self.nets:
+        for net in self._nets:
             if net.name == name:
                 return net
 
+    def _find(self, i:int)->int:
+        parent = self._parent
+        # Path halving
+        while (up := parent[i]) != i:
+            parent[i] = parent[up]
+            i = parent[i]
+        return i
+
     def get_net_of(self, port:Port)->Net|None:
-        for net in self.nets:
-            if port in net.ports:
-                return net
+        i = self._ids.get(port)
+        if i is None:
+            return None
+        return self._net_of_root[self._find(i)]
 
     def assign_net_ids(self):
+        self.num_nodes = 0
         for i, net in enumerate(self.nets):
             net.net_id = i
+            if net.gnd:
+                net.index = GND_INDEX
+            else:
+                net.index = self.num_nodes
+                self.num_nodes += 1
 
     def set_name(self, port:Port, name:str):
         self.get_net_of(port).name = name
 
-    def add_connection(self, port_a:Port, port_b:Port):
-
-        net_a = self.get_net_of(port_a) or Net(ports=[port_a, port_b])
-        net_b = self.get_net_of(port_b) or Net(ports=[port_a, port_b])
-
-        if net_a == net_b:
-            return # No connection needed
-
-        if net_a not in self.nets:
-            self.nets.append(net_a)
+    def _new_net(self, port:Port)->Net:
+        net = Net(ports=[port])
+        i = self._ids[port] = len(self._parent)
+        self._parent.append(i)
+        self._net_of_root.append(net)
+        self._nets[net] = None
+        self._nets_list = None
+        return net
+
+    def add_port(self, port:Port, net:Net|None=None)->Net:
+        """Add an unconnected port to net (or to a new net), returns the net of port.
+
+        Connects ports without recording the connection in Port.connections,
+        e.g. when reading a netlist where the nets are known by name.
+        """
+        if net is None:
+            return self._new_net(port)
+        self._ids[port] = len(self._parent)
+        # Below the first port of the net, later lookups compress the path
+        self._parent.append(self._ids[net.ports[0]])
+        self._net_of_root.append(None)
+        net.ports.append(port)
+        net.gnd |= port is GND
+        return net
 
-        if net_b not in self.nets:
-            self.nets.append(net_b)
-
-        self.merge_nets(net_a, net_b)
+    def add_connection(self, port_a:Port, port_b:Port):
+        self.add_connections(((port_a, port_b),))
+
+    def add_connections(self, connections:Iterable[tuple[Port, Port]]):
+        """Connect each pair of ports, the lookups are inlined for large netlists"""
+        ids, parent, net_of_root = self._ids, self._parent, self._net_of_root
+
+        for port_a, port_b in connections:
+            a = ids.get(port_a)
+            b = ids.get(port_b)
+            # Roots of both ports (with path halving)
+            if a is not None:
+                while (up := parent[a]) != a:
+                    parent[a] = a = parent[up]
+            if b is not None:
+                while (up := parent[b]) != b:
+                    parent[b] = b = parent[up]
+
+            if a is not None and a == b:
+                continue # No connection needed
+
+            # The net of port_a survives the merge. If port_a is not connected
+            # yet a new net is created (and appended to the list of nets).
+            if a is None:
+                net_a = self._new_net(port_a)
+                a = ids[port_a]
+            else:
+                net_a = net_of_root[a]
+
+            if b is None:
+                ids[port_b] = len(parent)
+                parent.append(a)
+                net_of_root.append(None)
+                net_a.ports.append(port_b)
+                net_a.gnd |= port_b is GND
+                continue
+
+            self.merge_nets(net_a, net_of_root[b])
 
     def merge_nets(self, net_a:Net, net_b:Net):
-        self.nets.remove(net_b)
-        assert net_a != net_b
-        net_a.ports += net_b.ports
-
-
-
-
+        assert net_a is not net_b
+
+        root = self._find(self._ids[net_a.ports[0]])
+        child = self._find(self._ids[net_b.ports[0]])
+
+        # Union by size: hang the smaller tree below the larger one
+        if len(net_a.ports) < len(net_b.ports):
+            root, child = child, root
+            net_b.ports += net_a.ports
+            net_a.ports = net_b.ports
+        else:
+            net_a.ports += net_b.ports
+        net_a.gnd |= net_b.gnd
+
+        self._parent[child] = root
+        self._net_of_root[child] = None
+        self._net_of_root[root] = net_a
+
+        del self._nets[net_b]
+        self._nets_list = None
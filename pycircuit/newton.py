@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import profiling
+from .components import Analysis
+from .matrix import TripletMatrix
+from .solver import Solver
+
+
+class ConvergenceError(Exception):
+    pass
+
+
+@dataclass
+class NewtonOptions:
+    max_iterations: int = 100
+    reltol: float = 1e-6
+    """Relative tolerance of the change of the solution between two iterations"""
+    abstol: float = 1e-9
+    """Absolute tolerance of the change of the solution between two iterations"""
+
+
+def solve_newton(compiled, analysis:Analysis, m:TripletMatrix, b:np.ndarray, x0:np.ndarray,
+                 lu:Solver, options:NewtonOptions, scale:float=1.0)->np.ndarray:
+    """Solve m*x + scale*i(x) = b, where i(x) are the currents of the nonlinear components.
+
+    m holds the linear stamps. In each iteration the companion models of the
+    nonlinear components are appended to them. The stamp sequence is the same
+    in every iteration, so the sparsity pattern and the LU column ordering are
+    computed only once.
+    """
+    layout = compiled.layout(analysis)
+    dimension = layout.dimension
+    factory = compiled.factory
+
+    linear_count = m.count
+    jacobian = m.copy(capacity=linear_count + 4*len(layout.nonlinear))
+    b_nonlinear = np.zeros(dimension+1, dtype=np.float64)
+
+    # Newton iterate, the trailing entry is ground (GND_INDEX)
+    solution = np.zeros(dimension+1, dtype=np.float64)
+    solution[:dimension] = x0
+    state = {}
+
+    for _ in range(options.max_iterations):
+        profiling.count("newton_iterations")
+        jacobian.truncate(linear_count)
+        b_nonlinear[:] = 0
+
+        limited = False
+        for component, index in layout.nonlinear:
+            limited |= bool(component.apply_nonlinear_matrix(factory, index, jacobian, b_nonlinear, solution, state))
+
+        if scale != 1.0:
+            jacobian.values[linear_count:jacobian.count] *= scale
+
+        lu.factorize(compiled.matrix(analysis, "jacobian", jacobian))
+        new_solution = lu.solve(b + scale*b_nonlinear[:dimension])
+
+        last_solution = solution[:dimension]
+        tolerance = options.reltol*np.maximum(np.abs(new_solution), np.abs(last_solution)) + options.abstol
+        converged = not limited and np.all(np.abs(new_solution - last_solution) <= tolerance)
+
+        solution[:dimension] = new_solution
+        if converged:
+            return new_solution
+
+    raise ConvergenceError(f"Newton-Raphson iteration did not converge within {options.max_iterations} iterations")
@@ -0,0 +1,163 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from collections.abc import Iterable, Iterator
+from typing import Callable
+
+
+@dataclass
+class PhaseStats:
+    time: float = 0.0
+    """Wall time in seconds"""
+    calls: int = 0
+
+
+@dataclass
+class MatrixStats:
+    dimension: int = 0
+    nnz: int = 0
+    """Non zeros of the last factorized matrix"""
+    factor_nnz: int = 0
+    """Non zeros of its L and U factors"""
+    factorizations: int = 0
+
+    @property
+    def fill_in(self) -> int:
+        return self.factor_nnz - self.nnz
+
+
+_active : ContextVar["Profile|None"] = ContextVar("profile", default=None)
+
+
+def active() -> "Profile|None":
+    """The profile collecting statistics, None if profiling is disabled"""
+    return _active.get()
+
+
+@contextmanager
+def phase(name:str):
+    """Time the enclosed code as phase name of the active profile (if any)"""
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    with profile.phase(name):
+        yield
+
+
+def iterate(name:str, items:Iterable) -> Iterator:
+    """Yield the items, producing each one is timed as phase name of the profile
+    that is active at that moment. The code consuming the items is not part of
+    the phase, so the phase has one call per item (and one for the end)."""
+    iterator = iter(items)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def count(name:str, n:int=1):
+    """Increase the counter name of the active profile (if any)"""
+    profile = _active.get()
+    if profile is not None:
+        profile.count(name, n)
+
+
+def update(components:list, *args):
+    """Call update(*args) of the dynamic components, timing each while profiling"""
+    profile = _active.get()
+    if profile is None:
+        for component in components:
+            component.update(*args)
+        return
+    for component in components:
+        start = time.perf_counter()
+        component.update(*args)
+        profile.updated(component, time.perf_counter() - start)
+
+
+class Profile:
+    """Statistics of the analyses run while the profile is active.
+
+    Phases are named after the analysis and the step within it, e.g.
+    "tran/factorize". callback(name, seconds) is called whenever a phase
+    was timed.
+    """
+
+    def __init__(self, callback:Callable[[str, float], None]|None=None) -> None:
+        self.callback = callback
+        self.phases : dict[str, PhaseStats] = {}
+        self.matrices : dict[str, MatrixStats] = {}
+        """Factorized matrices by phase"""
+        self.updates : dict[str, PhaseStats] = {}
+        """Cost of update() by component name"""
+        self.counters : dict[str, int] = {}
+        self._stack : list[str] = []
+        self._token = None
+
+    def __enter__(self) -> "Profile":
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *args):
+        _active.reset(self._token)
+        self._token = None
+
+    def _name(self, name:str) -> str:
+        return "/".join(self._stack + [name])
+
+    @contextmanager
+    def phase(self, name:str):
+        self._stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.record(name, elapsed)
+
+    def record(self, name:str, seconds:float):
+        name = self._name(name)
+        stats = self.phases.setdefault(name, PhaseStats())
+        stats.time += seconds
+        stats.calls += 1
+        if self.callback is not None:
+            self.callback(name, seconds)
+
+    def count(self, name:str, n:int=1):
+        name = self._name(name)
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def factorized(self, nnz:int, factor_nnz:int, dimension:int):
+        stats = self.matrices.setdefault(self._name("factorize"), MatrixStats())
+        stats.dimension = dimension
+        stats.nnz = nnz
+        stats.factor_nnz = factor_nnz
+        stats.factorizations += 1
+
+    def updated(self, component, seconds:float):
+        stats = self.updates.setdefault(component.name, PhaseStats())
+        stats.time += seconds
+        stats.calls += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "phases": {name: asdict(stats) for name, stats in self.phases.items()},
+            "matrices": {name: asdict(stats) | {"fill_in": stats.fill_in} for name, stats in self.matrices.items()},
+            "updates": {name: asdict(stats) for name, stats in self.updates.items()},
+            "counters": dict(self.counters),
+        }
+
+    def __str__(self) -> str:
+        lines = [f"{'phase':32} {'time [s]':>12} {'calls':>8}"]
+        lines += [f"{name:32} {stats.time:12.6f} {stats.calls:8}" for name, stats in self.phases.items()]
+        lines += [f"{name:32} nnz={stats.nnz} factor_nnz={stats.factor_nnz} fill_in={stats.fill_in}"
+                  for name, stats in self.matrices.items()]
+        lines += [f"update {name:25} {stats.time:12.6f} {stats.calls:8}" for name, stats in self.updates.items()]
+        lines += [f"{name:32} {count:>21}" for name, count in self.counters.items()]
+        return "\n".join(lines)
@@ -0,0 +1,36 @@
+import logging
+import time
+from collections.abc import Callable, Iterator
+
+import numpy as np
+
+logger = logging.getLogger("pycircuit")
+
+PROGRESS_INTERVAL = 1.0
+"""Minimum wall time in seconds between two progress reports"""
+
+
+def report_progress(points:Iterator[tuple[float, np.ndarray]], tstop:float,
+                    callback:Callable[[float, float], None]|None) -> Iterator[tuple[float, np.ndarray]]:
+    """Pass the time points through, reporting the simulated time.
+
+    callback(t, tstop) is called and the percentage is logged (level INFO) at
+    most every PROGRESS_INTERVAL seconds. Without a callback and with INFO
+    disabled (the default) the points are returned unchanged.
+    """
+    if callback is None and not logger.isEnabledFor(logging.INFO):
+        return points
+    return _throttled(points, tstop, callback)
+
+
+def _throttled(points:Iterator[tuple[float, np.ndarray]], tstop:float,
+               callback:Callable[[float, float], None]|None) -> Iterator[tuple[float, np.ndarray]]:
+    next_report = time.monotonic() + PROGRESS_INTERVAL
+    for t, x in points:
+        now = time.monotonic()
+        if now >= next_report:
+            next_report = now + PROGRESS_INTERVAL
+            if callback is not None:
+                callback(t, tstop)
+            logger.info("Transient analysis at %g s (%.0f %%)", t, 100*t/tstop)
+        yield t, x
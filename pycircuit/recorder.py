@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+
+_HEADER_SIZE = 128
+"""Size of the .npy header, fixed so it can be rewritten while the file grows"""
+CHUNK_ROWS = 4096
+"""Time points buffered in memory before they are written to a sink"""
+
+
+class MemoryRecorder:
+    """Time points of a run kept in memory, only the probed entries of x are stored"""
+
+    def __init__(self, probes:np.ndarray|None, dimension:int, capacity:int) -> None:
+        self.probes = probes
+        self.t = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty((dimension if probes is None else len(probes), capacity), dtype=np.float64, order="F")
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def append(self, t:float, x:np.ndarray):
+        if self.count == len(self.t):
+            t_new = np.empty(2*len(self.t), dtype=np.float64)
+            t_new[:self.count] = self.t
+            values = np.empty((self.values.shape[0], 2*len(self.t)), dtype=np.float64, order="F")
+            values[:, :self.count] = self.values
+            self.t, self.values = t_new, values
+        self.t[self.count] = t
+        self.values[:, self.count] = x if self.probes is None else x[self.probes]
+        self.count += 1
+
+    def result(self)->tuple[np.ndarray, np.ndarray]:
+        return self.values[:, :self.count], self.t[:self.count]
+
+
+class NpyRecorder:
+    """Streams the time points of a run into a .npy file.
+
+    The file holds one row per time point: the time followed by the probed
+    entries of x. Rows are buffered and written in chunks, so the memory use
+    does not depend on the length of the run. The header is updated after
+    each chunk, np.load(path, mmap_mode="r") returns the samples written so far.
+    Used as a context manager, the file is completed and closed also when the
+    run stops with an exception.
+    """
+
+    def __init__(self, path:str|os.PathLike, probes:np.ndarray|None, dimension:int, chunk:int=4096) -> None:
+        self.path = path
+        self.probes = probes
+        self.columns = 1 + (dimension if probes is None else len(probes))
+        self.buffer = np.empty((chunk, self.columns), dtype=np.float64)
+        self.buffered = 0
+        self.count = 0
+        self.file = open(path, "wb")
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_header(self):
+        header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, %d), }" % (self.count, self.columns)
+        header = header.ljust(_HEADER_SIZE - 11) + "\n"
+        self.file.seek(0)
+        self.file.write(b"\x93NUMPY\x01\x00" + np.uint16(len(header)).tobytes() + header.encode("latin1"))
+
+    def append(self, t:float, x:np.ndarray):
+        row = self.buffer[self.buffered]
+        row[0] = t
+        row[1:] = x if self.probes is None else x[self.probes]
+        self.buffered += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.file.seek(_HEADER_SIZE + self.count*self.columns*8)
+        self.file.write(self.buffer[:self.buffered].astype("<f8", copy=False).tobytes())
+        self.count += self.buffered
+        self.buffered = 0
+        self._write_header()
+        self.file.flush()
+
+    def close(self):
+        """Write the buffered time points and close the file"""
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+    def result(self)->tuple[np.ndarray, np.ndarray]:
+        """Memory mapped samples (one row per probe) and time points"""
+        self.close()
+        data = np.load(self.path, mmap_mode="r")
+        return data[:, 1:].T, data[:, 0]
+
+
+def probe_indices(x:list, probes:list[str]|None)->np.ndarray|None:
+    """Positions of the probes in x, None records all variables"""
+    if probes is None:
+        return None
+    names = [str(var) for var in x]
+    for probe in probes:
+        if probe not in names:
+            raise ValueError(f"Unknown probe {probe}")
+    return np.array([names.index(probe) for probe in probes], dtype=np.intp)
+
+
+def recorder(x:list, probes:list[str]|None, sink:str|os.PathLike|None, capacity:int):
+    """Recorder of a transient run, in memory or streamed to the .npy file sink"""
+    indices = probe_indices(x, probes)
+    if sink is not None:
+        return NpyRecorder(sink, indices, len(x), CHUNK_ROWS)
+    return MemoryRecorder(indices, len(x), capacity)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import profiling
+
+if TYPE_CHECKING:
+    from scipy.sparse import csc_matrix, csr_matrix
+
+
+ORDERINGS = ("COLAMD", "MMD_AT_PLUS_A", "MMD_ATA", "NATURAL", "RCM")
+"""Fill-reducing orderings of SparseLU: those of SuperLU and reverse Cuthill-McKee"""
+
+
+class Solver(ABC):
+    """Backend of the linear solves of the analyses, see Circuit.solver.
+
+    factorize(m) is called whenever the values of m change, solve(b) any
+    number of times in between. Solvers created by CompiledCircuit.solver()
+    for the same matrices share cache, so what is stored there (e.g. the
+    fill-reducing ordering of the pattern) is computed once per topology.
+    """
+
+    def __init__(self) -> None:
+        self.cache : dict = {}
+        """Data derived from the sparsity pattern (e.g. the ordering), shared between solvers"""
+
+    def factorize(self, m:csc_matrix):
+        profile = profiling.active()
+        if profile is None:
+            self._factorize(m)
+            return
+        start = time.perf_counter()
+        self._factorize(m)
+        profile.record("factorize", time.perf_counter() - start)
+        profile.factorized(m.nnz, self.factor_nnz(), m.shape[0])
+
+    def solve(self, b:np.ndarray) -> np.ndarray:
+        profile = profiling.active()
+        if profile is None:
+            return self._solve(b)
+        start = time.perf_counter()
+        x = self._solve(b)
+        profile.record("solve", time.perf_counter() - start)
+        return x
+
+    @abstractmethod
+    def _factorize(self, m:csc_matrix):
+        pass
+
+    @abstractmethod
+    def _solve(self, b:np.ndarray) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def factor_nnz(self) -> int:
+        """Number of nonzeros of the factors of the last factorization"""
+
+
+@dataclass
+class Ordering:
+    """Permutation of the rows and columns of one sparsity pattern"""
+    indices: np.ndarray
+    indptr: np.ndarray
+    columns: np.ndarray
+    """Column ordering, m[rows][:, columns] is factorized"""
+    rows: np.ndarray | None
+    """Row ordering (None keeps the rows in place)"""
+    data_order: np.ndarray
+    """Maps the data of m to the data of the permuted matrix"""
+    permuted_indices: np.ndarray
+    permuted_indptr: np.ndarray
+
+    @classmethod
+    def of(cls, m:csc_matrix, columns:np.ndarray, rows:np.ndarray|None=None) -> Ordering:
+        from scipy.sparse import csc_matrix
+
+        # Permute the positions of the entries to find where the data goes
+        positions = csc_matrix((np.arange(1, m.nnz+1, dtype=np.float64), m.indices, m.indptr), shape=m.shape)
+        if rows is not None:
+            positions = positions[rows]
+        positions = positions[:, columns].tocsc()
+        positions.sort_indices()
+        return cls(m.indices, m.indptr, columns, rows, positions.data.astype(np.intp) - 1,
+                   positions.indices, positions.indptr)
+
+    def matches(self, m:csc_matrix) -> bool:
+        if m.indices is self.indices and m.indptr is self.indptr:
+            return True
+        return np.array_equal(m.indptr, self.indptr) and np.array_equal(m.indices, self.indices)
+
+    def permute(self, m:csc_matrix) -> csc_matrix:
+        from scipy.sparse import csc_matrix
+
+        return csc_matrix((m.data[self.data_order], self.permuted_indices, self.permuted_indptr), shape=m.shape)
+
+
+class SparseLU(Solver):
+    """Sparse LU factorization (SuperLU) that reuses its fill-reducing ordering.
+
+    The first factorization of a sparsity pattern computes the ordering,
+    COLAMD by default or one of ORDERINGS. Matrices with the same pattern,
+    e.g. the Jacobians of consecutive Newton iterations, are factorized with
+    the rows and columns already permuted, so the ordering is not computed
+    again. SuperLU still repeats its symbolic factorization (elimination tree
+    and supernodes) on every call, only the ordering is reused. RCM permutes
+    rows and columns symmetrically, which keeps the factors of ladder and grid
+    like circuits banded.
+    """
+
+    def __init__(self, ordering:str="COLAMD") -> None:
+        super().__init__()
+        if ordering not in ORDERINGS:
+            raise ValueError(f"Unknown ordering {ordering}, use one of {ORDERINGS}")
+        self.ordering = ordering
+        self._lu = None
+        self._permuted : Ordering | None = None
+        """Ordering the last factorization was permuted with"""
+
+    def factor_nnz(self) -> int:
+        return self._lu.L.nnz + self._lu.U.nnz
+
+    def _factorize(self, m:csc_matrix):
+        from scipy.sparse.linalg import splu
+
+        ordering = self.cache.get(self.ordering)
+        if ordering is None or not ordering.matches(m):
+            if self.ordering != "RCM":
+                self._lu = splu(m, permc_spec=self.ordering)
+                self._permuted = None
+                # Remember the ordering together with the structure of the permuted m
+                self.cache[self.ordering] = Ordering.of(m, np.argsort(self._lu.perm_c))
+                return
+
+            from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+            order = reverse_cuthill_mckee((m + m.T).tocsr(), symmetric_mode=True).astype(np.intp)
+            ordering = self.cache[self.ordering] = Ordering.of(m, order, order)
+
+        self._lu = splu(ordering.permute(m), permc_spec="NATURAL")
+        self._permuted = ordering
+
+    def _solve(self, b:np.ndarray) -> np.ndarray:
+        ordering = self._permuted
+        if ordering is None:
+            return self._lu.solve(b)
+
+        y = self._lu.solve(b if ordering.rows is None else b[ordering.rows])
+        x = np.empty_like(y)
+        x[ordering.columns] = y
+        return x
+
+
+class DenseLU(Solver):
+    """Dense LU factorization (LAPACK), faster than sparse solvers for small circuits"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lu = None
+
+    def factor_nnz(self) -> int:
+        return self._lu[0].size
+
+    def _factorize(self, m:csc_matrix):
+        from scipy.linalg import lu_factor
+
+        self._lu = lu_factor(m.toarray())
+
+    def _solve(self, b:np.ndarray) -> np.ndarray:
+        from scipy.linalg import lu_solve
+
+        return lu_solve(self._lu, b)
+
+
+WOODBURY_RANK = 16
+"""Updates touching up to this many rows are solved with the Sherman-Morrison-Woodbury formula"""
+
+
+class LowRankSolver:
+    """Solves (a + delta)*x = b with the factorization of the fixed matrix a.
+
+    delta is a sparse update, e.g. the stamps of dynamic components in a time
+    step. Writing delta = E*d with E selecting the rows R touched by delta, the
+    Sherman-Morrison-Woodbury formula gives x = y - z*(I + d*z)^-1*d*y with
+    y = a^-1*b and z = a^-1*E. As a does not change, z is cached for the rows R.
+    Updates of a higher rank than WOODBURY_RANK are factorized directly.
+    """
+
+    def __init__(self, lu:Solver, full:Solver|None=None) -> None:
+        self.lu = lu
+        self._z : dict[bytes, np.ndarray] = {}
+        self._full = full if full is not None else SparseLU()
+        """Solver of the updates of a higher rank"""
+
+    def solve(self, a:csc_matrix, delta:csr_matrix, b:np.ndarray) -> np.ndarray:
+        rows = np.flatnonzero(np.diff(delta.indptr))
+        if len(rows) == 0:
+            return self.lu.solve(b)
+
+        if len(rows) > WOODBURY_RANK:
+            self._full.factorize((a + delta).tocsc())
+            return self._full.solve(b)
+
+        key = rows.tobytes()
+        z = self._z.get(key)
+        if z is None:
+            if len(self._z) >= 16:
+                self._z.clear()
+            e = np.zeros((a.shape[0], len(rows)), dtype=np.float64)
+            e[rows, np.arange(len(rows))] = 1
+            z = self._z[key] = self.lu.solve(e)
+
+        d = delta[rows]
+        y = self.lu.solve(b)
+        capacitance = np.eye(len(rows)) + d @ z
+        return y - z @ np.linalg.solve(capacitance, d @ y)
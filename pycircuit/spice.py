@@ -0,0 +1,229 @@
+import gc
+import os
+import re
+from collections.abc import Iterable, Iterator
+
+from .circuit import Circuit
+from .components import C, D, GND, IDC, MOS, R, VDC, Component
+from .netlister import Net, NetFactory
+
+GROUND_NAMES = {"0", "gnd", "gnd!"}
+"""Node names (lower case) of the ground net"""
+
+_SCALES = {"t": 1e12, "g": 1e9, "meg": 1e6, "k": 1e3, "mil": 25.4e-6,
+           "m": 1e-3, "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15}
+_NUMBER = re.compile(r"([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?(?:v|a|s|f|h|ohm|hz)?", re.IGNORECASE)
+_PARAMETER = re.compile(r"[a-z_][a-z0-9_]*", re.IGNORECASE)
+_COMMENT = re.compile(r";|\$ ")
+_EQUALS = re.compile(r"\s*=\s*")
+
+
+def parse_value(token:str) -> float|str:
+    """Value of a SPICE number with scale factor and unit (e.g. 4.7k, 10uF, 1meg).
+
+    The unit is optional and one of V, A, s, F, H, Ohm and Hz, other suffixes
+    are rejected.
+
+    Names (optionally in braces, e.g. {R1}) are returned as strings, so they
+    become symbols of the symbolic analysis.
+    """
+    match = _NUMBER.fullmatch(token)
+    if match:
+        value = float(match.group(1))
+        if match.group(2):
+            value *= _SCALES[match.group(2).lower()]
+        return value
+    name = token.strip("{}")
+    if _PARAMETER.fullmatch(name):
+        return name
+    raise ValueError(f"Invalid value {token}")
+
+
+def _cards(lines:Iterable[str], title:bool) -> Iterator[tuple[int, str]]:
+    """Line number and text of each card, continuation lines (+) are joined"""
+    card, number = None, 0
+    for i, line in enumerate(lines, start=1):
+        if title:
+            title = False
+            continue
+        line = _COMMENT.split(line, maxsplit=1)[0].strip()
+        if not line or line.startswith("*"):
+            continue
+        if line.startswith("+"):
+            if card is None:
+                raise ValueError(f"Line {i}: continuation without a card")
+            card += " " + line[1:]
+            continue
+        if card is not None:
+            yield number, card
+        card, number = line, i
+    if card is not None:
+        yield number, card
+
+
+def _tokens(card:str) -> list[str]:
+    # key = value is one token, parentheses of models are separators
+    if "=" in card:
+        card = _EQUALS.sub("=", card)
+    if "(" in card:
+        card = card.replace("(", " ").replace(")", " ")
+    return card.split()
+
+
+def _split(tokens:list[str]) -> tuple[list[str], dict[str, str]]:
+    """Positional tokens and key=value parameters (lower case keys)"""
+    positional = [token for token in tokens if "=" not in token]
+    parameters = {}
+    for token in tokens:
+        if "=" in token:
+            key, value = token.split("=", 1)
+            parameters[key.lower()] = value
+    return positional, parameters
+
+
+def _source(name:str, positional:list[str], number:int) -> tuple[float|str, float|str]:
+    """DC and AC value of a source card: n+ n- [DC] value [AC magnitude]"""
+    dc, ac = 0.0, 0.0
+    values = positional[3:]
+    i = 0
+    while i < len(values):
+        keyword = values[i].lower()
+        if keyword in ("dc", "ac") and i + 1 < len(values):
+            if keyword == "dc":
+                dc = parse_value(values[i+1])
+            else:
+                ac = parse_value(values[i+1])
+            i += 2
+        elif i == 0:
+            dc = parse_value(values[i])
+            i += 1
+        else:
+            raise ValueError(f"Line {number}: unsupported source specification of {name}: {values[i]}")
+    return dc, ac
+
+
+class _Reader:
+    def __init__(self) -> None:
+        self.circuit = Circuit()
+        self.factory = NetFactory()
+        self.nets : dict[str, Net] = {"0": self.factory.add_port(GND)}
+        self.nets["0"].name = "0"
+        self.models : dict[str, dict[str, str]] = {}
+        self.uses : list[tuple[Component, str, dict[str, str], int]] = []
+        """Components with a model, models may be defined after their use"""
+
+    def connect(self, component:Component, ports:list[str], nodes:list[str]):
+        for port, node in zip(ports, nodes):
+            # Node names are case insensitive, the net keeps the first spelling
+            key = node.lower()
+            if key in GROUND_NAMES:
+                key = "0"
+            net = self.nets.get(key)
+            self.nets[key] = self.factory.add_port(component.ports[port], net)
+            if net is None:
+                self.nets[key].name = node
+
+    def card(self, number:int, tokens:list[str]):
+        name = tokens[0]
+        kind = name[0].lower()
+        positional, parameters = _split(tokens)
+
+        if kind == ".":
+            command = name.lower()
+            if command == ".model":
+                if len(positional) < 3:
+                    raise ValueError(f"Line {number}: .model requires a name and a type")
+                self.models[positional[1].lower()] = {"type": positional[2].lower()} | parameters
+            elif command in (".subckt", ".ends", ".include", ".lib"):
+                raise ValueError(f"Line {number}: {command} is not supported")
+            return
+
+        nodes = {"r": 2, "c": 2, "v": 2, "i": 2, "d": 2, "m": 4}.get(kind)
+        if nodes is None:
+            raise ValueError(f"Line {number}: unsupported element {name}")
+        if len(positional) < 1 + nodes + (1 if kind in "rcdm" else 0):
+            raise ValueError(f"Line {number}: too few nodes or values for {name}")
+
+        if kind == "r":
+            component = R(name, parse_value(positional[3]))
+            ports = ["p", "n"]
+        elif kind == "c":
+            component = C(name, parse_value(positional[3]), dc=parse_value(parameters.get("ic", "0")))
+            ports = ["p", "n"]
+        elif kind == "v":
+            dc, ac = _source(name, positional, number)
+            component = VDC(name, dc=dc, ac=ac)
+            ports = ["p", "n"]
+        elif kind == "i":
+            component = IDC(name, _source(name, positional, number)[0])
+            # The current flows from n+ through the source into n-
+            ports = ["n", "p"]
+        elif kind == "d":
+            component = D(name, 1e-14, 1.0)
+            ports = ["p", "n"]
+            self.uses.append((component, positional[3].lower(), parameters, number))
+        else:
+            component = MOS(name)
+            ports = ["d", "g", "s", "b"]
+            self.uses.append((component, positional[5].lower(), parameters, number))
+
+        self.connect(component, ports, positional[1:nodes+1])
+        self.circuit.components.append(component)
+
+    def apply_models(self):
+        for component, model, parameters, number in self.uses:
+            if model not in self.models:
+                raise ValueError(f"Line {number}: unknown model {model} of {component.name}")
+            # Instance parameters override those of the model
+            parameters = self.models[model] | parameters
+            if isinstance(component, D):
+                component.reverse_bias_saturation_current = parse_value(parameters.get("is", "1e-14"))
+                component.ideality_factor = parse_value(parameters.get("n", "1"))
+                if "temp" in parameters:
+                    component.temperature_kelvin = parse_value(parameters["temp"]) + 273.15
+            else:
+                for parameter in ("gm", "gds", "gmb"):
+                    if parameter in parameters:
+                        setattr(component, parameter, parse_value(parameters[parameter]))
+
+
+def read_spice(source:str|os.PathLike|Iterable[str], title:bool=True, pause_gc:bool=False) -> Circuit:
+    """Read a SPICE netlist with R, C, V, I, D and M cards.
+
+    source is a path or an iterable of lines (e.g. an open file), which is
+    read line by line. The first line is the title unless title=False.
+    Nodes are added to the nets of the returned circuit by name (see
+    Circuit.factory), so the node names become the net names and no port
+    connections are created. Ground is "0" or "gnd".
+
+    Diodes use IS, N and TEMP (in Celsius) of their .model card, MOS
+    transistors the small signal parameters GM, GDS and GMB, given on the
+    card or in the model. Other dot commands (e.g. .tran) are ignored.
+
+    Reading allocates many objects that stay alive, so the garbage collector
+    traverses the growing circuit again and again. pause_gc=True disables it
+    while reading, which is faster for large netlists but affects all threads
+    of the process.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as lines:
+            return read_spice(lines, title, pause_gc)
+
+    enabled = pause_gc and gc.isenabled()
+    if enabled:
+        gc.disable()
+    try:
+        reader = _Reader()
+        for number, card in _cards(source, title):
+            tokens = _tokens(card)
+            if tokens[0].lower() == ".end":
+                break
+            reader.card(number, tokens)
+        reader.apply_models()
+    finally:
+        if enabled:
+            gc.enable()
+
+    reader.factory.assign_net_ids()
+    reader.circuit.factory = reader.factory
+    return reader.circuit
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from dataclasses import dataclass
+
+import numpy as np
+
+from .circuit import Circuit
+from .compiled import CompiledCircuit
+from .components import Analysis, Component, ComponentGroup, Port
+from .matrix import GND_INDEX, TripletMatrix
+
+
+@dataclass
+class _Template:
+    """Stamps of a subcircuit definition in its own (local) matrix indices"""
+    compiled: CompiledCircuit
+    dimension: int
+    terminals: np.ndarray
+    """Local index of the net of each terminal"""
+    internal: np.ndarray
+    """Local indices of the internal nodes and additional variables, in the
+    order of the additional rows of an instance"""
+    names: list[str] | None = None
+    """Local names of the internal variables, known after the first stamp"""
+
+    def mapping(self, indices:np.ndarray, nodes:list[np.ndarray]) -> np.ndarray:
+        """Global index of each local index (columns) of each instance (rows).
+
+        indices is the first additional row of each instance and nodes the
+        Net.index of each terminal. The extra last column maps the local
+        ground (GND_INDEX) to ground.
+        """
+        mapping = np.empty((len(indices), self.dimension+1), dtype=np.intp)
+        mapping[:, -1] = GND_INDEX
+        for terminal, node in zip(self.terminals, nodes):
+            mapping[:, terminal] = node
+        mapping[:, self.internal] = indices[:, None] + np.arange(len(self.internal))
+        return mapping
+
+
+def _remap(target:TripletMatrix, local:TripletMatrix, mapping:np.ndarray):
+    n = local.count
+    target.add_array(mapping[:, local.rows[:n]], mapping[:, local.cols[:n]], local.values[:n])
+
+
+def _remap_rhs(b:np.ndarray, local:np.ndarray, mapping:np.ndarray):
+    nonzero = np.flatnonzero(local)
+    np.add.at(b, mapping[:, nonzero], local[nonzero])
+
+
+class SubCircuit:
+    """Definition of a circuit block that is instantiated several times.
+
+        inverter = SubCircuit("inv", ["in", "out"])
+        inverter.add(r1, r2, ...)
+        inverter["in"] << r1["p"]
+        x1 = inverter.instance("X1")
+        x1["in"] << v1["p"]
+
+    Components inside the definition connect to its terminals (and to GND)
+    with <<. The definition is netlisted and stamped once per analysis into
+    a template in local indices, each instance only maps these to its
+    terminal nets and additional rows. Instances of the same definition are
+    stamped together, so the assembly time grows with the number of
+    definitions and not with the number of instantiated components.
+
+    Only linear components without update() are supported and the
+    definition must not change once it is instantiated.
+    """
+
+    def __init__(self, name:str, terminals:list[str]):
+        self.name = name
+        self.terminals = list(terminals)
+        self.ports : dict[str, Port] = {terminal: Port(name=terminal, parent=None) for terminal in self.terminals}
+        self.circuit = Circuit()
+        """Components of the definition"""
+        self._templates : dict[Analysis, _Template] = {}
+
+    def __getitem__(self, terminal:str) -> Port:
+        return self.ports[terminal]
+
+    def add(self, *components:Component):
+        self.circuit.add(*components)
+
+    def instance(self, name:str) -> SubCircuitInstance:
+        return SubCircuitInstance(name, self)
+
+    def _template(self, analysis:Analysis) -> _Template:
+        compiled = self.circuit.compile()
+        template = self._templates.get(analysis)
+        if template is not None and template.compiled is compiled:
+            return template
+
+        for component in self.circuit.components:
+            if component.is_nonlinear() or component.is_dynamic():
+                raise NotImplementedError(f"{self.name}: {component.name} is not supported in subcircuits, "
+                                          "only linear components without update() are")
+
+        terminals = []
+        for terminal, port in self.ports.items():
+            net = compiled.factory.get_net_of(port)
+            if net is None:
+                raise ValueError(f"{self.name}: terminal {terminal} is not connected")
+            if net.index == GND_INDEX or net.index in terminals:
+                raise ValueError(f"{self.name}: terminal {terminal} is shorted to ground or another terminal")
+            terminals.append(net.index)
+
+        dimension = compiled.layout(analysis).dimension
+        internal = np.setdiff1d(np.arange(dimension), terminals)
+        template = self._templates[analysis] = _Template(compiled, dimension, np.array(terminals, dtype=np.intp), internal)
+        return template
+
+
+class SubCircuitInstance(Component):
+    """Instance of a SubCircuit, its ports are the terminals of the definition.
+
+    The internal nodes and additional variables of the definition are the
+    additional rows of the instance, named "<instance>.<variable>".
+    """
+
+    def __init__(self, name:str, definition:SubCircuit):
+        super().__init__(name)
+        self.definition = definition
+        for terminal in definition.terminals:
+            self.ports[terminal] = Port(name=terminal, parent=self)
+
+    def get_num_additional_row_columns(self, analysis:Analysis):
+        return len(self.definition._template(analysis).internal)
+
+    @staticmethod
+    def _definitions(components:list[Component]) -> dict[SubCircuit, np.ndarray]:
+        """Positions of the instances of each definition"""
+        positions : dict[SubCircuit, list[int]] = {}
+        for i, component in enumerate(components):
+            positions.setdefault(component.definition, []).append(i)
+        return {definition: np.array(members, dtype=np.intp) for definition, members in positions.items()}
+
+    @classmethod
+    def _stamp_group(cls, factory, group:ComponentGroup, analysis:Analysis, matrices:tuple, x:list, b:np.ndarray):
+        names_of : list[list[str]] = [[]]*len(group)
+        for definition, members in cls._definitions(group.components).items():
+            template = definition._template(analysis)
+            if analysis is Analysis.OP:
+                names, *local, local_b = template.compiled.stamp_op()
+            else:
+                names, *local, local_b = template.compiled.stamp_tran()
+            if template.names is None:
+                template.names = [names[i] for i in template.internal]
+
+            mapping = template.mapping(group.indices[members],
+                                       [group.nodes(factory, terminal)[members] for terminal in definition.terminals])
+            for matrix, local_matrix in zip(matrices, local):
+                _remap(matrix, local_matrix, mapping)
+            _remap_rhs(b, local_b, mapping)
+            for i in members:
+                names_of[i] = template.names
+
+        x.extend(f"{component.name}.{name}" for component, names in zip(group.components, names_of) for name in names)
+
+    @classmethod
+    def apply_op_matrix_group(cls, factory, group:ComponentGroup, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        cls._stamp_group(factory, group, Analysis.OP, (m,), x, b)
+
+    @classmethod
+    def apply_tran_matrix_group(cls, factory, group:ComponentGroup, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        cls._stamp_group(factory, group, Analysis.TRANSIENT, (g, c), x, b)
+
+    def _group(self, index:int) -> ComponentGroup:
+        return ComponentGroup([self], np.array([index], dtype=np.intp))
+
+    def apply_op_matrix(self, factory, index:int, m:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        self.apply_op_matrix_group(factory, self._group(index), m, x, b, dimension)
+
+    def apply_tran_matrix(self, factory, index:int, g:TripletMatrix, c:TripletMatrix, x:list, b:np.ndarray, dimension:int):
+        self.apply_tran_matrix_group(factory, self._group(index), g, c, x, b, dimension)
+
+    def apply_ac_excitation(self, factory, index:int, b:np.ndarray):
+        template = self.definition._template(Analysis.TRANSIENT)
+        mapping = template.mapping(np.array([index], dtype=np.intp),
+                                   [np.array([factory.get_net_of(self.ports[terminal]).index])
+                                    for terminal in self.definition.terminals])
+        _remap_rhs(b, template.compiled.stamp_ac(), mapping)
@@ -0,0 +1,76 @@
+import numpy as np
+
+from .components import Analysis, Component
+from .matrix import TripletMatrix
+from .newton import solve_newton
+
+
+def sweep_rhs(compiled, component:Component, parameter:str, values:np.ndarray)->tuple[list, np.ndarray]:
+    """OP of a linear circuit for a parameter that only enters the right hand side.
+
+    The matrix is factorized once and all points are solved as one multi
+    column right hand side. As the right hand side depends linearly on the
+    parameter, the component is stamped only for the values 0 and 1.
+    """
+    layout = compiled.layout(Analysis.OP)
+    dimension = layout.dimension
+    index = layout.indices[compiled.circuit.components.index(component)]
+
+    x, m, b = compiled.assemble_op()
+
+    def stamp(value)->np.ndarray:
+        setattr(component, parameter, value)
+        b_component = np.zeros(dimension+1, dtype=np.float64)
+        m_component = TripletMatrix(m.shape)
+        component.apply_op_matrix(compiled.factory, index, m_component, [], b_component, dimension)
+        return b_component[:dimension]
+
+    original = getattr(component, parameter)
+    try:
+        b_original, b_zero, b_one = stamp(original), stamp(0.0), stamp(1.0)
+    finally:
+        setattr(component, parameter, original)
+
+    # Right hand side of all other components plus the one of the swept component
+    b_others = b - b_original
+    rhs = (b_others + b_zero)[:, None] + np.outer(b_one - b_zero, values)
+
+    lu = compiled.solver(Analysis.OP, "m")
+    lu.factorize(m)
+    return x, lu.solve(rhs)
+
+
+def sweep_op(circuit, compiled, component:Component, parameter:str, values:np.ndarray)->tuple[list, np.ndarray]:
+    """OP for every value of an arbitrary parameter.
+
+    Only the values are re-stamped, the cached sparsity pattern and the LU
+    ordering are shared by all points. Nonlinear circuits start each Newton
+    solve at the solution of the previous point.
+    """
+    nonlinear = compiled.layout(Analysis.OP).nonlinear
+    lu = compiled.solver(Analysis.OP, "jacobian" if nonlinear else "m")
+    answ = None
+    solution = None
+
+    original = getattr(component, parameter)
+    try:
+        for i, value in enumerate(values):
+            setattr(component, parameter, value)
+
+            if nonlinear:
+                x, m, b = compiled.stamp_op()
+                if solution is None:
+                    solution = np.zeros(len(x), dtype=np.float64)
+                solution = solve_newton(compiled, Analysis.OP, m, b, solution, lu, circuit.newton)
+            else:
+                x, m, b = compiled.assemble_op()
+                lu.factorize(m)
+                solution = lu.solve(b)
+
+            if answ is None:
+                answ = np.empty((len(x), len(values)), dtype=np.float64, order="F")
+            answ[:, i] = solution
+    finally:
+        setattr(component, parameter, original)
+
+    return x, answ
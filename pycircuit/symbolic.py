@@ -0,0 +1,195 @@
+from itertools import chain
+
+import numpy as np
+from sympy import Add, Expr, Float, Mul, QQ, Rational, S, ZZ, lambdify, simplify as simplify_expression, sympify
+from sympy.polys.matrices import DomainMatrix
+
+
+class SymbolicMatrix:
+    """Sparse (dictionary of keys) matrix for the symbolic stamps of the components.
+
+    Supports m[i, j] += value like a sympy Matrix, right hand sides may be
+    indexed with a single index (b[i] = value).
+    """
+
+    def __init__(self) -> None:
+        self.entries : dict[tuple[int, int], Expr] = {}
+
+    def __getitem__(self, key) -> Expr:
+        return self.entries.get(key if isinstance(key, tuple) else (key, 0), S.Zero)
+
+    def __setitem__(self, key, value):
+        self.entries[key if isinstance(key, tuple) else (key, 0)] = value
+
+    def rows(self, row_map:dict[int, int], column_map:dict[int, int], rational:bool) -> dict[int, dict[int, Expr]]:
+        """Non zero entries of the rows and columns in the maps (old -> new index)"""
+        rows = {}
+        for (i, j), value in self.entries.items():
+            if i not in row_map or j not in column_map:
+                continue
+            value = sympify(value)
+            if rational:
+                value = value.xreplace({f: Rational(repr(float(f))) for f in value.atoms(Float)})
+            if value != 0:
+                rows.setdefault(row_map[i], {})[column_map[j]] = value
+        return rows
+
+
+def _has_floats(matrices:list[SymbolicMatrix]) -> bool:
+    return any(sympify(value).has(Float) for matrix in matrices for value in matrix.entries.values())
+
+
+def _expression(numerator, denominator, gens:list, floats:bool) -> Expr:
+    # Cancel the common factors and make the denominator primitive with a positive leading coefficient
+    common = numerator.gcd(denominator)
+    numerator, denominator = numerator.exquo(common), denominator.exquo(common)
+    content, denominator = denominator.primitive()
+    if denominator.LC < 0:
+        content, denominator = -content, -denominator
+
+    if floats:
+        # Like the numeric parameters, the coefficients are returned as floats
+        result = Add(*(Float(int(coefficient)/int(content))*Mul(*(gen**e for gen, e in zip(gens, monom)))
+                       for monom, coefficient in numerator.terms()))
+    else:
+        result = numerator.as_expr()/int(content)
+    return result/denominator.as_expr()
+
+
+def _pivot(rows:dict[int, dict], columns:set[int]) -> tuple[int, int]:
+    """Row and column of a pivot: the sparsest column and in it the sparsest row"""
+    counts = {}
+    for row in rows.values():
+        for j in row:
+            if j in columns:
+                counts[j] = counts.get(j, 0) + 1
+    if len(counts) < len(columns):
+        raise ValueError("The circuit equations are singular")
+    column = min(counts, key=lambda j: (counts[j], j))
+    row = min((i for i, entries in rows.items() if column in entries),
+              key=lambda i: (len(rows[i]), len(rows[i][column].terms()), i))
+    return row, column
+
+
+def _eliminate(rows:dict[int, dict], row:int, column:int, previous, targets:dict[int, dict]):
+    """One step of fraction free (Bareiss) elimination of column with the pivot row.
+
+    Each target row becomes (pivot*row - row[column]*pivot_row)/previous, the
+    division is exact, so the entries stay polynomials of bounded degree.
+    """
+    pivot_row = rows[row]
+    pivot = pivot_row[column]
+    one = previous == 1
+    for i, target in targets.items():
+        factor = target.pop(column, None)
+        updated = {}
+        for j, value in target.items():
+            value = pivot*value
+            if factor is not None and j in pivot_row:
+                value -= factor*pivot_row[j]
+            if value:
+                updated[j] = value if one else value.exquo(previous)
+        if factor is not None:
+            for j, value in pivot_row.items():
+                if j != column and j not in target:
+                    updated[j] = -factor*value if one else (-factor*value).exquo(previous)
+        rows[i] = updated
+    return pivot
+
+
+def solve_symbolic(m:SymbolicMatrix, b:SymbolicMatrix, keep:list[int], outputs:list[int],
+                   simplify:bool=False) -> list[Expr]:
+    """Solve m*x = b for the entries outputs of x, only the rows/columns keep are used.
+
+    The entries are converted to rational functions and each row is multiplied
+    with the least common multiple of its denominators. The resulting
+    polynomial system is solved with sparse fraction free elimination, so no
+    intermediate expression needs to be simplified. The unknowns that are not
+    outputs are eliminated first, then only the remaining system of the
+    outputs is reduced to diagonal form (Gauss-Jordan), so unknowns that are
+    not requested are never solved for. Systems without free symbols are
+    solved with a rational LU decomposition.
+    """
+    floats = _has_floats([m, b])
+    remap = {old: new for new, old in enumerate(keep)}
+    n = len(keep)
+    a_rows = m.rows(remap, remap, floats)
+    b_rows = b.rows(remap, {0: 0}, floats)
+    outputs = [remap[output] for output in outputs]
+
+    gens = sorted(set().union(*(value.free_symbols for row in chain(a_rows.values(), b_rows.values())
+                                for value in row.values())), key=str)
+    if not gens:
+        a = DomainMatrix.from_dict_sympy(n, n, a_rows).convert_to(QQ)
+        x = a.lu_solve(DomainMatrix.from_dict_sympy(n, 1, b_rows).convert_to(QQ)).to_Matrix()
+        results = [Float(x[output]) if floats else x[output] for output in outputs]
+        return [simplify_expression(result) for result in results] if simplify else results
+
+    field = ZZ.frac_field(*gens)
+    ring = field.get_ring()
+    a = DomainMatrix.from_dict_sympy(n, n, a_rows).convert_to(field).rep
+    rhs = DomainMatrix.from_dict_sympy(n, 1, b_rows).convert_to(field).rep
+
+    # Multiply each row with the common denominator of its entries, the right
+    # hand side is stored as column n
+    rows = {}
+    for i in range(n):
+        row, row_rhs = a.get(i, {}), rhs.get(i, {})
+        denominator = ring.one
+        for value in chain(row.values(), row_rhs.values()):
+            denominator = denominator.lcm(value.denom)
+        rows[i] = {j: (value*denominator).numer for j, value in row.items()}
+        if row_rhs:
+            rows[i][n] = (row_rhs[0]*denominator).numer
+
+    # Forward elimination of the unknowns that are not outputs, their pivot
+    # rows are not needed afterwards
+    targets = set(outputs)
+    others = set(range(n)) - targets
+    previous = ring.one
+    while others:
+        row, column = _pivot(rows, others)
+        others.discard(column)
+        previous = _eliminate(rows, row, column, previous, {i: entries for i, entries in rows.items() if i != row})
+        del rows[row]
+
+    # Gauss-Jordan on the outputs, each row ends up as d*x[column] = rhs
+    solved = {}
+    while targets - set(solved):
+        row, column = _pivot({i: rows[i] for i in rows if i not in solved.values()}, targets - set(solved))
+        solved[column] = row
+        previous = _eliminate(rows, row, column, previous, {i: entries for i, entries in rows.items() if i != row})
+
+    results = []
+    for output in outputs:
+        row = rows[solved[output]]
+        results.append(_expression(row.get(n, ring.zero), row[output], gens, floats))
+    return [simplify_expression(result) for result in results] if simplify else results
+
+
+class SymbolicFunction:
+    """Results of a symbolic analysis compiled to a vectorized NumPy function.
+
+    Common subexpressions of all results are evaluated only once. Call it with
+    the free symbols as keyword arguments, e.g. f(s=2j*np.pi*freqs, R1=1e3).
+    The arguments are broadcast against each other and a dict with one array
+    per result is returned.
+    """
+
+    def __init__(self, results:dict) -> None:
+        self.names = list(results)
+        expressions = [sympify(expression) for expression in results.values()]
+        symbols = sorted(set().union(*(expression.free_symbols for expression in expressions)), key=str)
+        self.parameters = [str(symbol) for symbol in symbols]
+        """Names of the arguments"""
+        self._function = lambdify(symbols, expressions, modules="numpy", cse=True)
+
+    def __call__(self, **values) -> dict[str, np.ndarray]:
+        missing = set(self.parameters) - set(values)
+        if missing:
+            raise ValueError(f"Missing values for {', '.join(sorted(missing))}")
+
+        arguments = [np.asarray(values[parameter]) for parameter in self.parameters]
+        shape = np.broadcast_shapes(*(argument.shape for argument in arguments))
+        results = self._function(*arguments)
+        return {name: np.broadcast_to(result, shape) for name, result in zip(self.names, results)}
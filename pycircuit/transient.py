@@ -0,0 +1,195 @@
+import math
+from collections.abc import Iterator
+
+import numpy as np
+
+from . import profiling
+from .components import Analysis
+from .matrix import TripletMatrix
+from .newton import ConvergenceError, solve_newton
+from .solver import LowRankSolver
+
+METHODS = {
+    "euler": (1, 1/2),
+    "trap": (2, 1/12),
+    "gear2": (2, 2/9),
+}
+"""Order and error constant of the integration methods"""
+
+
+def integration_coefficients(method:str, h:float, h_prev:float, x:np.ndarray, x_prev:np.ndarray|None,
+                             dx:np.ndarray)->tuple[float, np.ndarray]:
+    """Discretise the derivative of the next time point as dx/dt = a0*x_next + history"""
+    if method == "euler":
+        a0 = 1/h
+        return a0, -a0*x
+    if method == "trap":
+        a0 = 2/h
+        return a0, -a0*x - dx
+    if method == "gear2":
+        a0 = (2*h + h_prev)/(h*(h + h_prev))
+        a1 = -(h + h_prev)/(h*h_prev)
+        a2 = h/(h_prev*(h + h_prev))
+        return a0, a1*x + a2*x_prev
+    raise ValueError(f"Unknown integration method {method}")
+
+
+def divided_difference(times:list[float], values:list[np.ndarray])->np.ndarray:
+    """Highest order divided difference of the points (times[i], values[i])"""
+    table = list(values)
+    for order in range(1, len(times)):
+        table = [(table[i+1] - table[i])/(times[i+order] - times[i]) for i in range(len(table)-1)]
+    return table[0]
+
+
+def local_truncation_error(method:str, times:list[float], values:list[np.ndarray])->np.ndarray:
+    """Estimate the LTE of the last step from the derivative of order+1,
+    which is approximated by divided differences over order+2 time points"""
+    order, error_constant = METHODS[method]
+    h = times[-1] - times[-2]
+    derivative = math.factorial(order+1)*divided_difference(times[-order-2:], values[-order-2:])
+    return error_constant*h**(order+1)*derivative
+
+
+def iter_integrate(circuit, compiled, x:list, g_stamps:TripletMatrix, c_stamps:TripletMatrix, b:np.ndarray,
+                   x0:np.ndarray, tstop:float, tstep:float, method:str="euler", adaptive:bool=False,
+                   reltol:float=1e-3, abstol:float=1e-6, tstep_min:float|None=None,
+                   tstep_max:float|None=None)->Iterator[tuple[float, np.ndarray]]:
+    """Transient simulation with a selectable integration method and optional
+    time step control based on the local truncation error (LTE).
+
+    Solves c*dx/dt + g*x + i(x) = b. With adaptive=False the time step is fixed
+    to tstep, otherwise tstep is the initial step and the step is grown and
+    shrunk such that the estimated LTE of the node voltages stays below
+    reltol*|x| + abstol. Steps with a too large LTE or without Newton
+    convergence are rejected and repeated with a smaller step. Yields the
+    accepted time points (t, x), starting with (0, x0).
+    """
+    order, _ = METHODS[method]
+    factory = compiled.factory
+    layout = compiled.layout(Analysis.TRANSIENT)
+    dimension = len(x)
+    num_nodes = factory.num_nodes
+
+    dynamic_components = layout.dynamic
+    c = compiled.matrix(Analysis.TRANSIENT, "c", c_stamps)
+
+    tstep_min = tstep_min or tstep*1e-6
+    tstep_max = tstep_max or max(tstep, tstop/50)
+
+    N = math.ceil(tstop/tstep)
+    yield 0.0, x0
+    count = 1
+
+    g_add = TripletMatrix(c.shape)
+    c_add = TripletMatrix(c.shape)
+    delta = TripletMatrix(c.shape)
+    b_add = np.zeros(dimension+1, dtype=np.float64)
+    # Solution of the last time step as seen by update(): the trailing
+    # entry is the ground voltage (GND_INDEX) and always zero
+    last_solution = np.zeros(dimension+1, dtype=np.float64)
+
+    lu = compiled.solver(Analysis.TRANSIENT, "jacobian" if layout.nonlinear else "system")
+    # Scale of the factorized system (linear circuits) or of the linear stamps
+    # c + scale*g of the Newton system (nonlinear circuits)
+    lu_scale = None
+
+    t = 0.0
+    h = tstep
+    h_prev = tstep
+    x_n = x0
+    x_prev = None
+    dx_n = np.zeros(dimension, dtype=np.float64)
+    times = [t]
+    history = [x0]
+
+    while (adaptive and t < tstop*(1 - 1e-12)) or (not adaptive and count <= N):
+
+        if adaptive:
+            h = min(h, tstop - t)
+            if tstop - t - h < tstep_min:
+                h = tstop - t
+
+        # Multi step methods need a previous time point, start with euler
+        step_method = method if count > 1 else "euler"
+        a0, dx_history = integration_coefficients(step_method, h, h_prev, x_n, x_prev, dx_n)
+        scale = 1/a0
+
+        # Apply dynamic updates of components
+        if dynamic_components:
+            g_add.clear()
+            c_add.clear()
+            b_add[:] = 0
+            last_solution[:dimension] = x_n
+            profiling.update(dynamic_components, factory, t, h, last_solution, g_add, c_add, x, b_add)
+
+        # (c + scale*g)*x + scale*i(x) = scale*b - scale*c*dx_history
+        rhs = scale*(b + b_add[:dimension]) - scale*(c@dx_history)
+        if c_add.count:
+            rhs -= scale*(c_add.tocsc()@dx_history)
+
+        try:
+            if layout.nonlinear:
+                if scale != lu_scale:
+                    linear_stamps = c_stamps.copy(capacity=c_stamps.count + g_stamps.count)
+                    linear_stamps.extend(g_stamps, scale)
+                    lu_scale = scale
+                stamps = linear_stamps
+                if g_add.count or c_add.count:
+                    stamps = linear_stamps.copy(capacity=linear_stamps.count + g_add.count + c_add.count)
+                    stamps.extend(g_add, scale)
+                    stamps.extend(c_add)
+                x_new = solve_newton(compiled, Analysis.TRANSIENT, stamps, rhs, x_n, lu, circuit.newton, scale=scale)
+            else:
+                # The factorization of c + scale*g only changes with the step size,
+                # the stamps of dynamic components are applied as low rank updates
+                if scale != lu_scale:
+                    stamps = c_stamps.copy(capacity=c_stamps.count + g_stamps.count)
+                    stamps.extend(g_stamps, scale)
+                    system = compiled.matrix(Analysis.TRANSIENT, "system", stamps)
+                    lu.factorize(system)
+                    updates = LowRankSolver(lu, compiled.solver(Analysis.TRANSIENT, "update"))
+                    lu_scale = scale
+                if g_add.count or c_add.count:
+                    delta.clear()
+                    delta.extend(g_add, scale)
+                    delta.extend(c_add)
+                    x_new = updates.solve(system, delta.tocsr(), rhs)
+                else:
+                    x_new = lu.solve(rhs)
+        except ConvergenceError:
+            if not adaptive or h <= tstep_min:
+                raise
+            profiling.count("rejected_steps")
+            h = max(h/8, tstep_min)
+            continue
+
+        factor = 2.0
+        if adaptive and len(times) >= order + 1:
+            lte = local_truncation_error(step_method, times + [t + h], history + [x_new])[:num_nodes]
+            tolerance = reltol*np.maximum(np.abs(x_new[:num_nodes]), np.abs(x_n[:num_nodes])) + abstol
+            ratio = np.max(np.abs(lte)/tolerance) if num_nodes else 0.0
+            if ratio > 1 and h > tstep_min:
+                # Reject the step
+                profiling.count("rejected_steps")
+                h = max(h*max(0.9*ratio**(-1/(order+1)), 0.25), tstep_min)
+                continue
+            if ratio > 0:
+                factor = min(0.9*ratio**(-1/(order+1)), 2.0)
+
+        # Accept the step
+        dx_n = a0*x_new + dx_history
+        x_prev, x_n = x_n, x_new
+        t = t + h if adaptive else count*tstep
+        profiling.count("steps")
+        yield t, x_new
+        count += 1
+
+        times.append(t)
+        history.append(x_new)
+        if len(times) > order + 2:
+            del times[0], history[0]
+
+        h_prev = h
+        if adaptive:
+            h = min(max(h*factor, tstep_min), tstep_max)
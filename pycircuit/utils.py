@@ -1,34 +0,0 @@
-import numpy as np
-from scipy.sparse import csr_matrix
-
-def delete_from_csr(mat, row_indices=[], col_indices=[]):
-    """
-    Remove the rows (denoted by ``row_indices``) and columns (denoted by ``col_indices``) from the CSR sparse matrix ``mat``.
-    WARNING: Indices of altered axes are reset in the returned matrix
-    """
-    if not isinstance(mat, csr_matrix):
-        raise ValueError("works only for CSR format -- use .tocsr() first")
-
-    rows = []
-    cols = []
-    if row_indices:
-        rows = list(row_indices)
-    if col_indices:
-        cols = list(col_indices)
-
-    if len(rows) > 0 and len(cols) > 0:
-        row_mask = np.ones(mat.shape[0], dtype=bool)
-        row_mask[rows] = False
-        col_mask = np.ones(mat.shape[1], dtype=bool)
-        col_mask[cols] = False
-        return mat[row_mask][:,col_mask]
-    elif len(rows) > 0:
-        mask = np.ones(mat.shape[0], dtype=bool)
-        mask[rows] = False
-        return mat[mask]
-    elif len(cols) > 0:
-        mask = np.ones(mat.shape[1], dtype=bool)
-        mask[cols] = False
-        return mat[:,mask]
-    else:
-        return mat
\ No newline at end of file
@@ -0,0 +1,87 @@
+import numpy as np
+
+from pycircuit import Circuit, GND
+from pycircuit.components import VDC, R, C, D
+
+
+def test_ac():
+    circuit = Circuit()
+
+    vdc = VDC(name="V1", dc=1, ac=1)
+    r1 = R(name="R1", value=1e3)
+    c = C(name="C1", value=1e-9)
+
+    vdc["p"] << r1["p"]
+    r1["n"] << c["p"]
+    c["n"] << vdc["n"] << GND
+
+    circuit.add(vdc, r1, c)
+
+    netlist = circuit.netlist()
+    netlist.set_name(c["p"], "vout")
+
+    freqs = np.logspace(2, 8, 1000)
+    x, result, f = circuit.analyse_ac(freqs, factory=netlist)
+
+    assert result.shape == (len(x), len(freqs))
+    vout = result[x.index("vout"), :]
+    assert np.allclose(vout, 1/(1 + 2j*np.pi*freqs*1e3*1e-9))
+
+
+def test_ac_sparse():
+    import pycircuit.ac
+
+    # RC ladder which is large enough for the sparse solver
+    circuit = Circuit()
+    vdc = VDC(name="V1", ac=1)
+    circuit.add(vdc)
+    node = vdc["p"]
+    for i in range(80):
+        r = R(name=f"R{i}", value=1e3)
+        c = C(name=f"C{i}", value=1e-12)
+        r["p"] << node
+        r["n"] << c["p"]
+        c["n"] << GND
+        circuit.add(r, c)
+        node = r["n"]
+    vdc["n"] << GND
+
+    freqs = np.logspace(3, 9, 50)
+    x, sparse, _ = circuit.analyse_ac(freqs)
+    _, threaded, _ = circuit.analyse_ac(freqs, workers=3)
+
+    dense_limit = pycircuit.ac.DENSE_LIMIT
+    try:
+        pycircuit.ac.DENSE_LIMIT = 1000
+        _, dense, _ = circuit.analyse_ac(freqs)
+    finally:
+        pycircuit.ac.DENSE_LIMIT = dense_limit
+
+    assert len(x) > dense_limit
+    assert np.allclose(sparse, dense)
+    assert np.allclose(threaded, dense)
+
+
+def test_ac_diode():
+    circuit = Circuit()
+
+    vdd = VDC(name="VDD", dc=5, ac=1)
+    r = R(name="R1", value=1e3)
+    diode = D("D1", 1e-14, 1)
+
+    vdd["p"] << r["p"]
+    r["n"] << diode["p"]
+    diode["n"] << vdd["n"] << GND
+
+    circuit.add(vdd, r, diode)
+
+    netlist = circuit.netlist()
+    netlist.set_name(diode["p"], "vd")
+
+    x_op, op = circuit.analyse_op(netlist)
+    _, gd = diode.current(op[x_op.index("vd")])
+
+    x, result, _ = circuit.analyse_ac([1e3], factory=netlist)
+
+    # Voltage divider of R1 and the small signal resistance of the diode
+    assert np.isclose(result[x.index("vd"), 0], (1/gd)/(1e3 + 1/gd))
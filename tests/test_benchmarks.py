@@ -0,0 +1,15 @@
+from benchmarks.circuits import CIRCUITS
+from benchmarks.run import compare, run
+
+
+def test_benchmarks():
+    results = run(list(CIRCUITS), [2], repeat=1, tran_steps=5, symbolic_max=2)
+
+    assert [result["circuit"] for result in results["results"]] == list(CIRCUITS)
+    for result in results["results"]:
+        phases = result["phases"]
+        assert all(phases[phase] > 0 for phase in ("netlist", "reassembly", "op", "tran_step"))
+        assert (phases["symbolic"] is None) == (result["circuit"] == "diode_chain")
+
+    assert results["import"] > 0
+    assert compare(results, results) == []
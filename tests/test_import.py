@@ -0,0 +1,9 @@
+import subprocess
+import sys
+
+
+def test_import_time():
+    # SymPy and SciPy are only imported by the analyses that need them
+    script = "import sys, pycircuit; print(sorted({m.split('.')[0] for m in sys.modules} & {'sympy', 'scipy'}))"
+    modules = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    assert modules.strip() == "[]"
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from pycircuit import Circuit, GND
+from pycircuit.components import VDC, R, MOS
+from pycircuit.montecarlo import MonteCarlo, Normal, Uniform
+
+
+def test_monte_carlo():
+    circuit = Circuit()
+
+    vdd = VDC(name="VDD", dc=1)
+    r1 = R(name="R1", value=1e3)
+    r2 = R(name="R2", value=1e3)
+
+    vdd["p"] << r1["p"]
+    r1["n"] << r2["p"]
+    r2["n"] << vdd["n"] << GND
+
+    circuit.add(vdd, r1, r2)
+
+    netlist = circuit.netlist()
+    netlist.set_name(r2["p"], "vout")
+
+    mc = MonteCarlo(circuit, {(r1, "value"): Normal(1e3, 50), (r2, "value"): Uniform(900, 1100)}, factory=netlist)
+    x, values, result = mc.run(100, seed=1, workers=1)
+    _, values_pool, result_pool = mc.run(100, seed=1, workers=2, chunksize=30)
+
+    assert values.shape == (2, 100)
+    assert result.shape == (len(x), 100)
+    assert np.array_equal(values, values_pool)
+    assert np.allclose(result, result_pool)
+    assert np.allclose(result[x.index("vout")], values[1]/(values[0] + values[1]))
+    assert r1.value == 1e3
+
+
+def test_corners_mos():
+    circuit = Circuit()
+
+    vin = VDC(name="VIN", dc=0.1)
+    mos = MOS(name="M1", gm=1e-3)
+    rl = R(name="RL", value=10e3)
+
+    vin["p"] << mos["g"]
+    mos["d"] << rl["p"]
+    mos["s"] << mos["b"] << rl["n"] << vin["n"] << GND
+
+    circuit.add(vin, mos, rl)
+
+    netlist = circuit.netlist()
+    netlist.set_name(mos["d"], "vout")
+
+    mc = MonteCarlo(circuit, {(mos, "gm"): Normal(1e-3, 1e-4), (rl, "value"): Normal(10e3, 1e3)}, factory=netlist)
+    corners = [{(mos, "gm"): gm, (rl, "value"): value} for gm in (0.9e-3, 1.1e-3) for value in (9e3, 11e3)]
+    x, values, result = mc.run_corners(corners + [{}], workers=1)
+
+    # Gain of a common source stage is -gm*RL, missing parameters keep their value
+    assert np.allclose(result[x.index("vout")], -0.1*values[0]*values[1])
+    assert result[x.index("vout"), -1] == pytest.approx(-1.0)
+    assert np.allclose(values[:, -1], [1e-3, 10e3])
+
+
+def test_monte_carlo_spawn():
+    import multiprocessing
+    import pickle
+
+    # Long chains of connected ports, pickled for the workers of the spawn
+    # start method
+    circuit = Circuit()
+    vdc = VDC(name="V1", dc=1)
+    vdc["n"] << GND
+    circuit.add(vdc)
+    node = vdc["p"]
+    for i in range(1000):
+        series = R(name=f"RS{i}", value=100)
+        shunt = R(name=f"RP{i}", value=10e3)
+        series["p"] << node
+        series["n"] << shunt["p"]
+        shunt["n"] << GND
+        circuit.add(series, shunt)
+        node = series["n"]
+
+    netlist = circuit.netlist()
+    netlist.set_name(node, "vout")
+
+    copy = pickle.loads(pickle.dumps(circuit))
+    assert copy._topology() == circuit._topology()
+    assert copy.components[1]["n"].connections[0] is copy.components[2]["p"]
+    assert pickle.loads(pickle.dumps(GND)) is GND
+
+    mc = MonteCarlo(circuit, {(circuit.components[1], "value"): Normal(100, 5)}, factory=netlist,
+                    mp_context=multiprocessing.get_context("spawn"))
+    x, values, result = mc.run(8, seed=1, workers=2)
+    _, _, expected = mc.run(8, seed=1, workers=1)
+    assert np.allclose(result, expected)
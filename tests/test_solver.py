@@ -0,0 +1,43 @@
+import numpy as np
+
+from pycircuit import Circuit, GND
+from pycircuit.components import VDC, R, C
+
+
+def test_solver_backends():
+    from functools import partial
+    from pycircuit import DenseLU, SparseLU
+    from pycircuit.components import Analysis
+    from pycircuit.solver import ORDERINGS
+
+    circuit = Circuit()
+    vdc = VDC(name="V1", dc=1, ac=1)
+    circuit.add(vdc)
+    node = vdc["p"]
+    for i in range(40):
+        r = R(name=f"R{i}", value=1e3)
+        c = C(name=f"C{i}", value=1e-12)
+        shunt = R(name=f"RP{i}", value=1e4)
+        r["p"] << node
+        r["n"] << c["p"] << shunt["p"]
+        c["n"] << shunt["n"] << GND
+        circuit.add(r, c, shunt)
+        node = r["n"]
+    vdc["n"] << GND
+
+    freqs = np.logspace(3, 9, 5)
+    x, op = circuit.analyse_op()
+    _, tran, _ = circuit.analyse_tran(tstop=1e-9, tstep=0.1e-9)
+    _, ac, _ = circuit.analyse_ac(freqs)
+
+    # The ordering is computed once per topology and shared by later analyses
+    compiled = circuit.compile()
+    ordering = compiled.solver(Analysis.OP, "m").cache["COLAMD"]
+    circuit.analyse_op()
+    assert compiled.solver(Analysis.OP, "m").cache["COLAMD"] is ordering
+
+    for solver in [partial(SparseLU, ordering=ordering) for ordering in ORDERINGS] + [DenseLU]:
+        circuit.solver = solver
+        assert np.allclose(circuit.analyse_op()[1], op)
+        assert np.allclose(circuit.analyse_tran(tstop=1e-9, tstep=0.1e-9)[1], tran)
+        assert np.allclose(circuit.analyse_ac(freqs)[1], ac)
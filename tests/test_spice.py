@@ -0,0 +1,84 @@
+import gc
+import io
+
+import numpy as np
+import pytest
+
+from pycircuit import GND, read_spice
+from pycircuit.components import R, D
+from pycircuit.spice import parse_value
+
+
+def test_parse_value():
+    assert parse_value("4.7k") == 4.7e3
+    assert parse_value("10uF") == pytest.approx(10e-6)
+    assert parse_value("1MEG") == 1e6
+    assert parse_value("2m") == 2e-3
+    assert parse_value("1e-3") == 1e-3
+    assert parse_value("{Rload}") == "Rload"
+    assert parse_value("1kOhm") == 1e3
+    assert parse_value("5mA") == 5e-3
+    for token in ("1x", "10q", "1kx"):
+        with pytest.raises(ValueError, match="Invalid value"):
+            parse_value(token)
+
+
+def test_read_spice():
+    deck = io.StringIO("""diode test
+* V1 drives a diode through R1
+V1 in 0 DC 5 AC 1
+R1 in out
++ 1k ; continuation line
+D1 out gnd dmod
+I1 0 out 1m
+.model dmod D(IS = 1e-14 N=1)
+.op
+.end
+R2 in 0 1k
+""")
+    circuit = read_spice(deck)
+
+    factory = circuit.netlist()
+    assert [net.name for net in factory.nets] == ["0", "in", "out"]
+    assert factory.get("0").is_gnd()
+    assert all(not port.connections for component in circuit.components for port in component.ports.values())
+
+    x, solution = circuit.analyse_op()
+    # I1 adds 1 mA to the current through the diode
+    i_diode = (solution[x.index("in")] - solution[x.index("out")])/1e3 + 1e-3
+    d1 = circuit.components[2]
+    assert isinstance(d1, D) and d1.ideality_factor == 1.0
+    assert np.isclose(i_diode, 1e-14*(np.exp(solution[x.index("out")]/d1.thermal_voltage) - 1), rtol=1e-6)
+
+    # Components connected with << are added to the nets that were read
+    r3 = R("R3", 1e3)
+    r3["p"] << circuit.components[1]["n"]
+    r3["n"] << GND
+    circuit.add(r3)
+    x, loaded = circuit.analyse_op()
+    assert len(circuit.netlist().nets) == 3
+    assert loaded[x.index("out")] < solution[x.index("out")]
+
+
+def test_read_spice_ladder(tmp_path):
+    path = tmp_path / "ladder.sp"
+    n = 1000
+    with open(path, "w") as file:
+        file.write("ladder\nV1 n0 0 1\n")
+        for i in range(n):
+            # Node names are case insensitive
+            file.write(f"R{i} N{i} n{i+1} 1\nRG{i} N{i+1} GND 1meg\n")
+
+    circuit = read_spice(path, pause_gc=True)
+    assert gc.isenabled()
+    x, solution = circuit.analyse_op()
+    assert len(x) == n + 2
+    assert solution[x.index("n0")] == pytest.approx(1.0)
+    assert 0 < solution[x.index(f"n{n}")] < solution[x.index(f"n{n//2}")] < 1
+
+
+def test_read_spice_errors():
+    with pytest.raises(ValueError, match="Line 2: unsupported element L1"):
+        read_spice(["title", "L1 a 0 1u"])
+    with pytest.raises(ValueError, match="unknown model"):
+        read_spice(["D1 a 0 missing"], title=False)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from pycircuit import Circuit, GND, SubCircuit
+from pycircuit.components import C, D, R, VDC
+
+
+def _section(name:str, node):
+    """RC low pass with a 0V source as ammeter, returns the components and the output port"""
+    r1 = R(name=f"{name}R1", value=1e3)
+    c = C(name=f"{name}C", value=1e-9)
+    ammeter = VDC(name=f"{name}V", dc=0)
+    r2 = R(name=f"{name}R2", value=2e3)
+
+    r1["p"] << node
+    r1["n"] << c["p"] << ammeter["p"]
+    c["n"] << GND
+    ammeter["n"] << r2["p"]
+    return [r1, c, ammeter, r2], r2["n"]
+
+
+def _circuit(hierarchical:bool):
+    circuit = Circuit()
+    vdc = VDC(name="V1", dc=1, ac=1)
+    vdc["n"] << GND
+    circuit.add(vdc)
+
+    section = SubCircuit("section", ["in", "out"])
+    components, out = _section("", section["in"])
+    section.add(*components)
+    section["out"] << out
+
+    node = vdc["p"]
+    for i in range(3):
+        if hierarchical:
+            instance = section.instance(f"X{i}")
+            instance["in"] << node
+            circuit.add(instance)
+            node = instance["out"]
+        else:
+            components, node = _section(f"X{i}", node)
+            circuit.add(*components)
+
+    load = R(name="RL", value=5e3)
+    load["p"] << node
+    load["n"] << GND
+    circuit.add(load)
+
+    netlist = circuit.netlist()
+    netlist.set_name(node, "vout")
+    return circuit, netlist
+
+
+def test_subcircuit():
+    flat, flat_netlist = _circuit(hierarchical=False)
+    hierarchical, netlist = _circuit(hierarchical=True)
+
+    x, solution = hierarchical.analyse_op(netlist)
+    x_flat, solution_flat = flat.analyse_op(flat_netlist)
+    assert len(x) == len(x_flat)
+    assert "X1.I" in " ".join(x)
+    assert solution[x.index("vout")] == pytest.approx(solution_flat[x_flat.index("vout")])
+
+    x, result, t = hierarchical.analyse_tran(tstop=10e-6, tstep=0.1e-6, factory=netlist)
+    x_flat, result_flat, _ = flat.analyse_tran(tstop=10e-6, tstep=0.1e-6, factory=flat_netlist)
+    assert np.allclose(result[x.index("vout")], result_flat[x_flat.index("vout")])
+
+    freqs = np.logspace(3, 7, 20)
+    x, result, f = hierarchical.analyse_ac(freqs, factory=netlist)
+    x_flat, result_flat, _ = flat.analyse_ac(freqs, factory=flat_netlist)
+    assert np.allclose(result[x.index("vout")], result_flat[x_flat.index("vout")])
+
+
+def test_subcircuit_errors():
+    section = SubCircuit("divider", ["a", "b"])
+    r = R("R1", 1e3)
+    r["p"] << section["a"]
+    r["n"] << GND
+    section.add(r)
+
+    circuit = Circuit()
+    circuit.add(section.instance("X1"))
+    with pytest.raises(ValueError, match="terminal b is not connected"):
+        circuit.analyse_op()
+
+    section["b"] << r["p"]
+    circuit = Circuit()
+    circuit.add(section.instance("X2"))
+    with pytest.raises(ValueError, match="terminal b is shorted"):
+        circuit.analyse_op()
+
+    section = SubCircuit("diode", ["a"])
+    d = D("D1", 1e-14, 1.0)
+    d["p"] << section["a"]
+    d["n"] << GND
+    section.add(d)
+    circuit = Circuit()
+    circuit.add(section.instance("X3"))
+    with pytest.raises(NotImplementedError, match="D1"):
+        circuit.analyse_op()
@@ -0,0 +1,40 @@
+import numpy as np
+
+from pycircuit import Circuit, GND
+from pycircuit.components import VDC, IDC, R
+
+
+def test_dc_sweep():
+    circuit = Circuit()
+
+    vdc = VDC(name="V1", dc=1)
+    idc = IDC(name="I1", dc=0)
+    r1 = R(name="R1", value=1e3)
+    r2 = R(name="R2", value=1e3)
+
+    vdc["p"] << r1["p"]
+    r1["n"] << r2["p"] << idc["n"]
+    r2["n"] << vdc["n"] << idc["p"] << GND
+
+    circuit.add(vdc, idc, r1, r2)
+
+    netlist = circuit.netlist()
+    netlist.set_name(r1["n"], "mid")
+
+    values = np.linspace(-2, 2, 41)
+    x, result = circuit.analyse_dc_sweep(vdc, values, factory=netlist)
+    assert result.shape == (len(x), len(values))
+    assert np.allclose(result[x.index("mid"), :], values/2)
+    assert vdc.dc == 1
+
+    x, result = circuit.analyse_dc_sweep(idc, values*1e-3, factory=netlist)
+    # The current flows from mid through the source to ground
+    assert np.allclose(result[x.index("mid"), :], 0.5 - values*1e-3*500)
+
+    # The general path re-stamps the circuit for each point
+    x, result_param = circuit.analyse_param_sweep(idc, "dc", values*1e-3, factory=netlist)
+    assert np.allclose(result, result_param)
+
+    x, result = circuit.analyse_param_sweep(r2, "value", [1e3, 3e3, 9e3], factory=netlist)
+    assert np.allclose(result[x.index("mid"), :], [0.5, 0.75, 0.9])
+    assert r2.value == 1e3
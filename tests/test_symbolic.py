@@ -115,4 +115,125 @@ def test_symbolic_amp():
     gm, gds = symbols("gm, gds")
     assert result["VOUT"] == 1.0*gm/(gds+1)
 
+    # Solving only for the output gives the same expression
+    assert circuit.analyse_symbolic(netlist, outputs=["VOUT"]) == {"VOUT": result["VOUT"]}
 
+
+def test_netlist_merge():
+
+    circuit = Circuit()
+
+    resistors = [R(name=f"R{i}", value=100) for i in range(6)]
+
+    # Build two separate nets first and join them afterwards
+    resistors[0]["p"] << resistors[1]["p"] << resistors[2]["p"]
+    resistors[3]["p"] << resistors[4]["p"]
+    resistors[2]["p"] << resistors[3]["p"]
+    resistors[5]["p"] << GND
+    for r in resistors:
+        r["n"] << GND
+
+    circuit.add(*resistors)
+
+    factory = circuit.netlist()
+
+    assert len(factory.nets) == 2
+    net = factory.get_net_of(resistors[0]["p"])
+    for r in resistors[:5]:
+        assert factory.get_net_of(r["p"]) is net
+        assert r["p"] in net.ports
+    assert factory.get_net_of(resistors[5]["p"]).is_gnd()
+    assert factory.get_net_of(resistors[5]["p"]) is factory.get_net_of(resistors[0]["n"])
+
+def test_netlist_ground():
+    circuit = Circuit()
+
+    r1 = R(name="R1", value=100)
+    r2 = R(name="R2", value=100)
+    connections = len(GND.connections)
+
+    # Connections to GND are stored at the component port only, in both directions
+    GND << r1["n"]
+    r2["n"] << GND
+    r1["p"] << r2["p"]
+    circuit.add(r1, r2)
+
+    assert len(GND.connections) == connections
+    assert not hasattr(r1["p"], "__dict__")
+
+    factory = circuit.netlist()
+    ground = factory.get_net_of(GND)
+    assert ground.is_gnd() and not factory.get_net_of(r1["p"]).is_gnd()
+    assert factory.get_net_of(r1["n"]) is ground and factory.get_net_of(r2["n"]) is ground
+    assert factory.num_nodes == 1
+
+def test_symbolic_lambdify():
+    import numpy as np
+
+    circuit = Circuit()
+
+    vdc = VDC(name="V1", ac=1)
+    r1 = R(name="R1", value="R")
+    cap = C(name="C1", value=1e-9)
+
+    r1["p"] << vdc["p"]
+    vdc["n"] << GND << cap["n"]
+    r1["n"] << cap["p"]
+
+    circuit.add(vdc, r1, cap)
+
+    netlist = circuit.netlist()
+    netlist.set_name(r1["n"], "vout")
+
+    f = circuit.analyse_symbolic(netlist, lambdify=True)
+    assert f.parameters == ["R", "s"]
+    assert circuit.analyse_symbolic(netlist, lambdify=True) is f
+
+    s = 2j*np.pi*np.logspace(0, 9, 100000)
+    result = f(s=s, R=1e3)
+    assert result["vout"].shape == s.shape
+    assert np.allclose(result["vout"], 1/(1 + s*1e3*1e-9))
+
+    # A changed parameter invalidates the cached function
+    cap.value = 2e-9
+    g = circuit.analyse_symbolic(netlist, lambdify=True)
+    assert g is not f
+    assert np.allclose(g(s=s, R=1e3)["vout"], 1/(1 + s*1e3*2e-9))
+
+    # A sweep keeps only the most recently used functions
+    from pycircuit.compiled import SYMBOLIC_CACHE_SIZE
+
+    for value in np.linspace(1e-9, 2e-9, 2*SYMBOLIC_CACHE_SIZE).tolist():
+        cap.value = value
+        circuit.analyse_symbolic(netlist, lambdify=True)
+    assert len(circuit.compile(netlist).symbolic) == SYMBOLIC_CACHE_SIZE
+    assert circuit.analyse_symbolic(netlist, lambdify=True) is circuit.analyse_symbolic(netlist, lambdify=True)
+
+def test_symbolic_ladder():
+    import numpy as np
+
+    # Too large for a dense solve with a global simplify
+    circuit = Circuit()
+    vdc = VDC(name="V1", ac=1)
+    circuit.add(vdc)
+    node = vdc["p"]
+    for i in range(15):
+        r = R(name=f"R{i}", value=1e3)
+        cap = C(name=f"C{i}", value=1e-9)
+        r["p"] << node
+        r["n"] << cap["p"]
+        cap["n"] << GND
+        circuit.add(r, cap)
+        node = r["n"]
+    vdc["n"] << GND
+
+    netlist = circuit.netlist()
+    netlist.set_name(node, "vout")
+
+    result = circuit.analyse_symbolic(netlist, outputs=["vout"])
+    assert list(result) == ["vout"]
+
+    freqs = np.array([1e3, 1e5, 1e6])
+    x, ac, _ = circuit.analyse_ac(freqs, factory=netlist)
+    f = circuit.analyse_symbolic(netlist, lambdify=True, outputs=["vout"])
+    assert np.allclose(f(s=2j*np.pi*freqs)["vout"], ac[x.index("vout")])
@@ -2,6 +2,7 @@ from pycircuit import Circuit, GND, NetFactory
 from pycircuit.components import VDC, R, C, Component, Port, CurrentPort, IDC, D
 import matplotlib.pyplot as plt
 import numpy as np
+import pytest
 
 def test_op():
     circuit = Circuit()
@@ -20,6 +21,51 @@ def test_op():
     assert result[0] == 1.0
     assert result[1] == 1e-4
 
+def test_compile():
+    circuit = Circuit()
+
+    vdc = VDC(name="V1", dc=1)
+    r1 = R(name="R1", value=1e3)
+    r2 = R(name="R2", value=1e3)
+
+    vdc["p"] << r1["p"]
+    r1["n"] << r2["p"]
+    r2["n"] << vdc["n"] << GND
+
+    circuit.add(vdc, r1, r2)
+
+    netlist = circuit.netlist()
+    netlist.set_name(r1["n"], "mid")
+
+    compiled = circuit.compile(netlist)
+    x, result = circuit.analyse_op()
+    assert circuit.compile() is compiled
+    assert np.isclose(result[x.index("mid")], 0.5)
+
+    # Changing a value only refreshes the numbers, not the topology
+    r1.value = 3e3
+    x, result = circuit.analyse_op()
+    assert circuit.compile() is compiled
+    assert np.isclose(result[x.index("mid")], 0.25)
+
+    # Adding components or connections requires a new netlist
+    r3 = R(name="R3", value=1e3)
+    r3["p"] << r2["p"]
+    r3["n"] << GND
+    circuit.add(r3)
+    netlist = circuit.netlist()
+    netlist.set_name(r1["n"], "mid")
+    x, result = circuit.analyse_op(netlist)
+    assert circuit.compile() is not compiled
+    assert np.isclose(result[x.index("mid")], 1/7)
+
+    # Nets can be renamed after an analysis, the additional variables keep their names
+    netlist.set_name(r1["n"], "center")
+    renamed, _ = circuit.analyse_op(netlist)
+    assert renamed == [name if name != "mid" else "center" for name in x]
+    x, *_ = circuit.analyse_tran(tstop=1e-6, tstep=0.1e-6, factory=netlist)
+    assert "center" in x
+
 def test_tran():
     circuit = Circuit()
 
@@ -45,6 +91,69 @@ def test_tran():
     #plt.grid(True)
     #plt.show()
 
+def test_tran_result_shape():
+    circuit = Circuit()
+
+    c = C(name="C1", value = 10e-12, dc=0)
+    r1 = R(name="R1", value=100e3)
+    vdc = VDC(name="VDC", dc=1.5)
+
+    vdc["p"] << r1["p"]
+    r1["n"] << c["p"]
+    c["n"] << vdc["n"] << GND
+
+    circuit.add(c, r1, vdc)
+
+    netlist = circuit.netlist()
+    netlist.set_name(c["p"], "vout")
+
+    x, result, t = circuit.analyse_tran(tstop=20e-6, tstep=0.1e-6, factory=netlist)
+
+    assert result.shape == (len(x), len(t))
+    assert t[0] == 0.0
+    assert t[-1] >= 20e-6
+    assert np.allclose(np.diff(t), 0.1e-6)
+
+    # The capacitor is charged to the supply after 20 time constants
+    vout = result[x.index("vout"), :]
+    assert vout[0] == 0.0
+    assert abs(vout[-1] - 1.5) < 1e-6
+    assert np.all(np.diff(vout) >= 0)
+
+def test_tran_adaptive():
+
+    for method in ["euler", "trap", "gear2"]:
+        circuit = Circuit()
+
+        c = C(name="C1", value = 10e-12, dc=0)
+        r1 = R(name="R1", value=100e3)
+        vdc = VDC(name="VDC", dc=1.5)
+
+        vdc["p"] << r1["p"]
+        r1["n"] << c["p"]
+        c["n"] << vdc["n"] << GND
+
+        circuit.add(c, r1, vdc)
+
+        netlist = circuit.netlist()
+        netlist.set_name(c["p"], "vout")
+
+        x, result, t = circuit.analyse_tran(tstop=10e-6, tstep=0.05e-6, factory=netlist,
+                                            method=method, adaptive=True, tstep_max=1e-6)
+
+        assert result.shape == (len(x), len(t))
+        assert t[0] == 0.0
+        assert np.isclose(t[-1], 10e-6)
+        assert np.all(np.diff(t) > 0)
+
+        # The step grows while the capacitor settles
+        steps = np.diff(t)
+        assert steps.max() > 4*steps[0]
+        assert len(t) < 200
+
+        vout = result[x.index("vout"), :]
+        assert np.allclose(vout, 1.5*(1 - np.exp(-t/1e-6)), atol=0.02)
+
 class MyComponent(Component):
     def __init__(self, name: str):
         super().__init__(name)
@@ -57,14 +166,14 @@ class MyComponent(Component):
 
         net = factory.get_net_of(self.ports["cur_out"])
 
-        cap_volt = signals[net.net_id]
+        cap_volt = signals[net.index]
         if cap_volt < 1.5:
             self.state = True
         elif cap_volt > 2.5:
             self.state = False
 
         if self.state:
-            b[net.net_id] = 30e-6
+            b[net.index] = 30e-6
 
 
 def test_custom_component():
@@ -110,5 +219,344 @@ def test_diode():
 
     circuit.add(vdd, r, diode)
 
-    #circuit.analyse_dc(component=vdd, dc=np.linspace(start=0, stop=1.5, num=30))
-    circuit.analyse_op()
\ No newline at end of file
+    netlist = circuit.netlist()
+    netlist.set_name(diode["p"], "vd")
+
+    x, sweep = circuit.analyse_dc_sweep(component=vdd, values=np.linspace(start=0, stop=1.5, num=30), factory=netlist)
+    assert sweep.shape == (len(x), 30)
+    assert sweep[x.index("vd"), 0] == 0.0
+    assert np.all(np.diff(sweep[x.index("vd"), :]) > 0)
+    assert vdd.dc == 1
+
+    x, result = circuit.analyse_op(netlist)
+
+    vd = result[x.index("vd")]
+    current, _ = diode.current(vd)
+    assert 0 < vd < 1
+    assert np.isclose(current, (1 - vd)/10e3, rtol=1e-6)
+
+def test_diode_forward():
+
+    circuit = Circuit()
+
+    vdd = VDC(name="VDD", dc = 5)
+    r = R(name="R1", value=1e3)
+    diode = D("D1", 1e-14, 1)
+
+    vdd["p"] << r["p"]
+    r["n"] << diode["p"]
+    diode["n"] << vdd["n"] << GND
+
+    circuit.add(vdd, r, diode)
+
+    netlist = circuit.netlist()
+    netlist.set_name(diode["p"], "vd")
+
+    x, result = circuit.analyse_op(netlist)
+
+    vd = result[x.index("vd")]
+    current, _ = diode.current(vd)
+    assert 0.6 < vd < 0.8
+    assert np.isclose(current, (5 - vd)/1e3, rtol=1e-6)
+
+def test_diode_tran():
+
+    circuit = Circuit()
+
+    vdd = VDC(name="VDD", dc = 2)
+    r = R(name="R1", value=10e3)
+    c = C(name="C1", value=10e-12, dc=0)
+    diode = D("D1", 1e-14, 1)
+
+    vdd["p"] << r["p"]
+    r["n"] << diode["p"] << c["p"]
+    diode["n"] << c["n"] << vdd["n"] << GND
+
+    circuit.add(vdd, r, c, diode)
+
+    netlist = circuit.netlist()
+    netlist.set_name(diode["p"], "vd")
+
+    x, result, t = circuit.analyse_tran(tstop=2e-6, tstep=10e-9, factory=netlist)
+
+    # The capacitor charges up until the diode clamps the voltage
+    vd = result[x.index("vd"), :]
+    assert vd[0] == 0.0
+    assert np.all(np.diff(vd) >= -1e-12)
+
+    # Steady state: the whole current flows through the diode
+    current, _ = diode.current(vd[-1])
+    assert 0.5 < vd[-1] < 0.7
+    assert np.isclose(current, (2 - vd[-1])/10e3, rtol=1e-3)
+
+def test_tran_probes_sink(tmp_path, monkeypatch):
+    circuit = Circuit()
+
+    c = C(name="C1", value=10e-12, dc=3)
+    r1 = R(name="R1", value=100e3)
+    vdc = VDC(name="VDC", dc=1.5)
+
+    c["p"] << r1["p"]
+    c["n"] << r1["n"] << vdc["p"]
+    vdc["n"] << GND
+
+    circuit.add(c, r1, vdc)
+
+    netlist = circuit.netlist()
+    netlist.set_name(c["p"], "vc")
+
+    x, signals, t = circuit.analyse_tran(tstop=10e-6, tstep=0.3e-6, factory=netlist)
+    x_probe, probed, t_probe = circuit.analyse_tran(tstop=10e-6, tstep=0.3e-6, factory=netlist, probes=["vc"])
+
+    assert x_probe == ["vc"]
+    assert np.array_equal(probed[0], signals[x.index("vc")])
+    assert np.array_equal(t_probe, t)
+
+    # Write the samples in several chunks
+    monkeypatch.setattr("pycircuit.recorder.CHUNK_ROWS", 7)
+    path = tmp_path / "tran.npy"
+    for method in ["euler", "trap"]:
+        _, streamed, t_streamed = circuit.analyse_tran(tstop=10e-6, tstep=0.3e-6, factory=netlist, method=method,
+                                                       probes=["vc"], sink=path)
+        _, reference, _ = circuit.analyse_tran(tstop=10e-6, tstep=0.3e-6, factory=netlist, method=method)
+        assert np.array_equal(streamed[0], reference[x.index("vc")])
+        assert np.array_equal(t_streamed, t)
+
+        data = np.load(path)
+        assert data.shape == (len(t), 2)
+        assert np.array_equal(data[:, 1], reference[x.index("vc")])
+
+class Failure(Component):
+    """Raises in update() from t_fail on"""
+    def __init__(self, name: str, t_fail: float):
+        super().__init__(name)
+        self.t_fail = t_fail
+
+    def apply_tran_matrix(self, factory, index, g, c, x, b, dimension):
+        pass
+
+    def apply_op_matrix(self, factory, index, m, x, b, dimension):
+        pass
+
+    def update(self, factory, t, dt, signals, g, c, x, b):
+        if t >= self.t_fail:
+            raise RuntimeError("failed")
+
+def test_tran_sink_exception(tmp_path, monkeypatch):
+    circuit = Circuit()
+
+    c = C(name="C1", value=10e-12, dc=3)
+    r1 = R(name="R1", value=100e3)
+    vdc = VDC(name="VDC", dc=1.5)
+
+    c["p"] << r1["p"]
+    c["n"] << r1["n"] << vdc["p"]
+    vdc["n"] << GND
+
+    circuit.add(c, r1, vdc, Failure("F1", t_fail=5.05e-6))
+
+    # The samples of the run until the exception are written and the file is complete
+    monkeypatch.setattr("pycircuit.recorder.CHUNK_ROWS", 7)
+    path = tmp_path / "tran.npy"
+    with pytest.raises(RuntimeError, match="failed"):
+        circuit.analyse_tran(tstop=10e-6, tstep=0.1e-6, sink=path)
+
+    data = np.load(path)
+    assert data.shape == (52, 1 + 3)
+    assert data[-1, 0] == pytest.approx(5.1e-6)
+
+def test_iter_tran():
+    circuit = Circuit()
+
+    c = C(name="C1", value=10e-12, dc=3)
+    r1 = R(name="R1", value=100e3)
+    vdc = VDC(name="VDC", dc=1.5)
+
+    c["p"] << r1["p"]
+    c["n"] << r1["n"] << vdc["p"]
+    vdc["n"] << GND
+
+    circuit.add(c, r1, vdc)
+
+    netlist = circuit.netlist()
+    netlist.set_name(c["p"], "vc")
+
+    x, signals, t = circuit.analyse_tran(tstop=10e-6, tstep=0.1e-6, factory=netlist)
+    vc = signals[x.index("vc")]
+
+    # Stop as soon as the capacitor is discharged to 1.6V
+    for i, (t_i, values) in enumerate(circuit.iter_tran(tstop=10e-6, tstep=0.1e-6, factory=netlist, probes=["vc"])):
+        assert t_i == t[i]
+        assert values[0] == vc[i]
+        if values[0] < 1.6:
+            break
+    assert i == np.argmax(vc < 1.6)
+
+    blocks = list(circuit.iter_tran(tstop=10e-6, tstep=0.1e-6, factory=netlist, block=30))
+    assert [len(t_block) for t_block, _ in blocks] == [30, 30, 30, len(t) - 90]
+    assert np.array_equal(np.concatenate([values for _, values in blocks], axis=1), signals)
+
+def test_group_stamps():
+
+    class ScaledR(R):
+        """Overrides the stamps of R, so it must not be stamped with R's group stamps"""
+        def apply_op_matrix(self, factory, index, m, x, b, dimension):
+            self.value *= 2
+            super().apply_op_matrix(factory, index, m, x, b, dimension)
+            self.value /= 2
+
+    circuit = Circuit()
+
+    vdd = VDC(name="VDD", dc=2)
+    idc = IDC(name="I1", dc=1e-3)
+    r1 = R(name="R1", value=1e3)
+    r2 = ScaledR(name="R2", value=500)
+    r3 = R(name="R3", value=1e3)
+    c = C(name="C1", value=1e-9, dc=0.25)
+    vsense = VDC(name="VSENSE", dc=0)
+
+    vdd["p"] << r1["p"]
+    r1["n"] << r2["p"] << idc["n"]
+    idc["p"] << r3["p"]
+    r3["n"] << vsense["p"]
+    vsense["n"] << c["p"]
+    r2["n"] << vdd["n"] << c["n"] << GND
+
+    circuit.add(vdd, r1, c, idc, r2, r3, vsense)
+
+    netlist = circuit.netlist()
+    netlist.set_name(r1["n"], "mid")
+    netlist.set_name(idc["p"], "top")
+
+    x, result = circuit.analyse_op(netlist)
+
+    assert R.has_group_stamps("apply_op_matrix")
+    assert not ScaledR.has_group_stamps("apply_op_matrix")
+    assert ScaledR.has_group_stamps("apply_tran_matrix")
+
+    # The source currents follow the order of the components, not of the groups
+    assert [str(var).startswith("I_initial") for var in x[-3:]] == [False, True, False]
+    # 1mA drawn from mid into top, R1 || 2*R2 divider
+    assert np.isclose(result[x.index("mid")], 1.0 - 1e-3*500)
+    assert np.isclose(result[x.index("top")], 0.25 + 1e-3*1e3)
+
+class Switch(Component):
+    """Conductance between its ports, switched on at t_on"""
+    def __init__(self, name: str, t_on: float, conductance: float):
+        super().__init__(name)
+        self.t_on = t_on
+        self.conductance = conductance
+        self.ports["p"] = Port("p", parent=self)
+        self.ports["n"] = Port("n", parent=self)
+
+    def apply_tran_matrix(self, factory, index, g, c, x, b, dimension):
+        pass
+
+    def apply_op_matrix(self, factory, index, m, x, b, dimension):
+        pass
+
+    def update(self, factory, t, dt, signals, g, c, x, b):
+        if t >= self.t_on:
+            id_p = factory.get_net_of(self.ports["p"]).index
+            id_n = factory.get_net_of(self.ports["n"]).index
+            g.add(id_p, id_p, self.conductance)
+            g.add(id_n, id_n, self.conductance)
+            g.add(id_p, id_n, -self.conductance)
+            g.add(id_n, id_p, -self.conductance)
+
+def test_dynamic_matrix_update(monkeypatch):
+    circuit = Circuit()
+
+    vdc = VDC(name="V1", dc=1)
+    r = R(name="R1", value=1e3)
+    c = C(name="C1", value=1e-9, dc=1)
+    switch = Switch("S1", t_on=2e-6, conductance=1e-3)
+
+    vdc["p"] << r["p"]
+    r["n"] << c["p"] << switch["p"]
+    c["n"] << switch["n"] << vdc["n"] << GND
+
+    circuit.add(vdc, r, c, switch)
+
+    netlist = circuit.netlist()
+    netlist.set_name(c["p"], "vc")
+
+    for method in ["euler", "trap"]:
+        x, woodbury, t = circuit.analyse_tran(tstop=10e-6, tstep=0.05e-6, factory=netlist, method=method)
+
+        # Refactorize the updated system instead
+        monkeypatch.setattr("pycircuit.solver.WOODBURY_RANK", 0)
+        _, direct, _ = circuit.analyse_tran(tstop=10e-6, tstep=0.05e-6, factory=netlist, method=method)
+        monkeypatch.undo()
+
+        assert np.allclose(woodbury, direct, rtol=1e-9, atol=1e-12)
+        # The switch halves the voltage of the divider
+        vc = woodbury[x.index("vc")]
+        assert np.isclose(vc[t < 2e-6][-1], 1.0) and np.isclose(vc[-1], 0.5, rtol=1e-3)
+
+def test_profile():
+    circuit = Circuit()
+
+    vdc = VDC(name="V1", dc=1)
+    r = R(name="R1", value=1e3)
+    c = C(name="C1", value=1e-9, dc=1)
+    switch = Switch("S1", t_on=2e-6, conductance=1e-3)
+
+    vdc["p"] << r["p"]
+    r["n"] << c["p"] << switch["p"]
+    c["n"] << switch["n"] << vdc["n"] << GND
+
+    circuit.add(vdc, r, c, switch)
+
+    phases = []
+    with circuit.profile(callback=lambda phase, seconds: phases.append(phase)) as report:
+        _, expected, t = circuit.analyse_tran(tstop=10e-6, tstep=0.05e-6)
+    _, result, _ = circuit.analyse_tran(tstop=10e-6, tstep=0.05e-6)
+
+    # Profiling does not change the results and is only active within the with block
+    assert np.array_equal(expected, result)
+    assert report.phases["tran"].calls == 1
+    assert phases[-1] == "tran"
+    assert {"netlist", "compile", "stamp", "op", "factorize", "solve"} <= {phase.split("/")[-1] for phase in report.phases}
+    assert report.counters["tran/steps"] == len(t) - 1
+    assert report.updates["S1"].calls == len(t) - 1
+    assert report.matrices["tran/factorize"].factor_nnz >= report.matrices["tran/factorize"].nnz > 0
+
+    summary = report.as_dict()
+    assert summary["updates"]["S1"]["time"] > 0
+    assert "tran/factorize" in str(report)
+
+    # Generator driven runs are profiled while the time points are produced
+    with circuit.profile() as report:
+        points = list(circuit.iter_tran(tstop=10e-6, tstep=0.05e-6))
+    assert report.phases["tran"].calls == len(points) + 1
+    assert report.counters["tran/steps"] == len(t) - 1
+    assert report.matrices["tran/factorize"].nnz > 0
+
+def test_progress(monkeypatch, caplog, capsys):
+    circuit = Circuit()
+
+    vdc = VDC(name="V1", dc=1)
+    r = R(name="R1", value=1e3)
+    c = C(name="C1", value=1e-9, dc=0)
+
+    vdc["p"] << r["p"]
+    r["n"] << c["p"]
+    c["n"] << vdc["n"] << GND
+
+    circuit.add(vdc, r, c)
+
+    # Silent by default
+    circuit.analyse_tran(tstop=10e-6, tstep=0.1e-6)
+    assert capsys.readouterr().out == ""
+    assert not caplog.records
+
+    reports = []
+    circuit.progress = lambda t, tstop: reports.append(t/tstop)
+    monkeypatch.setattr("pycircuit.progress.PROGRESS_INTERVAL", 0.0)
+    with caplog.at_level("INFO", logger="pycircuit"):
+        _, _, t = circuit.analyse_tran(tstop=10e-6, tstep=0.1e-6)
+
+    assert len(reports) == len(t)
+    assert reports == sorted(reports) and np.isclose(reports[-1], t[-1]/10e-6)
+    assert any("Transient analysis" in record.message for record in caplog.records)